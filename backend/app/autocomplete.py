@@ -0,0 +1,190 @@
+"""标题前缀自动补全：进程内的有序数组索引，启动时从 todos 构建，之后由 crud 的写操作增量维护"""
+import heapq
+import threading
+from bisect import bisect_left, insort
+from typing import Iterable, List, Optional
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+from . import models
+
+# 最多保留的不同标题数，超出后按使用频率淘汰
+MAX_TITLES = 10000
+# 每次淘汰的比例，批量淘汰避免每次插入都扫描全部标题
+EVICT_FRACTION = 0.1
+# 单次建议最多返回的标题数，与接口 limit 的上限一致
+TOP_K = 50
+# 匹配数不超过该值的前缀直接读取有序列表中的区间，超过的前缀读取预先排好的前若干个标题
+SCAN_LIMIT = 2 * TOP_K
+# 使用次数的权重超过该值时整体缩小，避免浮点溢出
+AGING_RESCALE = 2.0 ** 512
+
+class TitleIndex:
+    """标题前缀索引
+
+    小写标题保存在有序列表中，前缀查询用 bisect 定位匹配区间。
+    每个标题记录仍在使用它的待办 id 和使用次数（创建或改名为该标题的次数），
+    建议按使用次数排序，超出容量时淘汰使用次数最少的标题。
+    每次淘汰后新的使用按两倍权重计数，相当于把已有的计数减半，旧标题不会永久压过新标题。
+
+    匹配数超过 SCAN_LIMIT 的前缀另外保存按使用次数排好的前 TOP_K 到 SCAN_LIMIT 个标题，
+    写入时增量维护，因此任何前缀的一次查询最多读取 SCAN_LIMIT 个标题。
+    """
+
+    def __init__(self, max_titles: int = MAX_TITLES):
+        self.max_titles = max_titles
+        self._lock = threading.Lock()
+        self._keys: List[str] = []
+        # 小写标题 -> [原始标题, 待办 id 集合, 使用次数]
+        self._titles: dict[str, list] = {}
+        self._by_id: dict[int, str] = {}
+        # 前缀 -> 该前缀下排名最前的小写标题
+        self._top: dict[str, List[str]] = {}
+        self._weight = 1.0
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+    def clear(self):
+        self.load(())
+
+    def load(self, rows: Iterable[tuple[int, str]]):
+        """用 (id, title) 重建索引"""
+        with self._lock:
+            self._keys.clear()
+            self._titles.clear()
+            self._by_id.clear()
+            self._top.clear()
+            self._weight = 1.0
+            for todo_id, title in rows:
+                self._add(todo_id, title)
+            self._evict()
+
+    def add(self, todo_id: int, title: str):
+        with self._lock:
+            self._add(todo_id, title)
+            self._evict(keep=title.casefold())
+
+    def discard(self, todo_id: int):
+        with self._lock:
+            self._discard(todo_id)
+
+    def discard_many(self, todo_ids: Iterable[int]):
+        """批量删除后移除对应的待办，只加一次锁"""
+        with self._lock:
+            for todo_id in todo_ids:
+                self._discard(todo_id)
+
+    def rename(self, todo_id: int, title: str):
+        with self._lock:
+            key = title.casefold()
+            if self._by_id.get(todo_id) == key:
+                self._titles[key][0] = title
+                return
+            self._discard(todo_id)
+            self._add(todo_id, title)
+            self._evict(keep=key)
+
+    def suggest(self, prefix: str, limit: int = 10) -> List[str]:
+        """返回以 prefix 开头（不区分大小写）的标题，使用次数多的在前，最多 TOP_K 个"""
+        key = prefix.casefold()
+        with self._lock:
+            top = self._top.get(key)
+            if top is None:
+                start, end = self._range(key)
+                top = sorted(self._keys[start:end], key=self._rank)
+            return [self._titles[existing][0] for existing in top[:limit]]
+
+    def _rank(self, key: str) -> tuple:
+        return -self._titles[key][2], key
+
+    def _range(self, prefix: str) -> tuple[int, int]:
+        start = bisect_left(self._keys, prefix)
+        return start, bisect_left(self._keys, prefix + "\U0010ffff", start)
+
+    def _best(self, prefix: str) -> List[str]:
+        start, end = self._range(prefix)
+        return heapq.nsmallest(SCAN_LIMIT, self._keys[start:end], key=self._rank)
+
+    def _add(self, todo_id: int, title: str):
+        key = title.casefold()
+        entry = self._titles.get(key)
+        if entry is None:
+            entry = self._titles[key] = [title, set(), 0.0]
+            insort(self._keys, key)
+        entry[1].add(todo_id)
+        entry[2] += self._weight
+        self._by_id[todo_id] = key
+        self._promote(key)
+
+    def _promote(self, key: str):
+        """key 是新标题或使用次数刚增加，更新它所有前缀的排名"""
+        rank = self._rank(key)
+        for length in range(len(key) + 1):
+            prefix = key[:length]
+            top = self._top.get(prefix)
+            if top is None:
+                start, end = self._range(prefix)
+                if end - start > SCAN_LIMIT:
+                    self._top[prefix] = self._best(prefix)
+                continue
+            if key in top:
+                top.remove(key)
+            elif len(top) >= TOP_K and rank > self._rank(top[-1]):
+                # 列表不足 TOP_K 个时覆盖了整个匹配区间，否则排在末尾之后的标题不需要记录
+                continue
+            insort(top, key, key=self._rank)
+            del top[SCAN_LIMIT:]
+
+    def _demote(self, key: str):
+        """key 已从索引中删除，从它所有前缀的排名中移除，剩余不足 TOP_K 个时重新取前几名"""
+        for length in range(len(key) + 1):
+            prefix = key[:length]
+            top = self._top.get(prefix)
+            if top is None or key not in top:
+                continue
+            top.remove(key)
+            if len(top) < TOP_K:
+                self._top[prefix] = self._best(prefix)
+                if not self._top[prefix]:
+                    del self._top[prefix]
+
+    def _discard(self, todo_id: int):
+        key = self._by_id.pop(todo_id, None)
+        if key is None:
+            return
+        ids = self._titles[key][1]
+        ids.discard(todo_id)
+        if not ids:
+            del self._titles[key]
+            del self._keys[bisect_left(self._keys, key)]
+            self._demote(key)
+
+    def _evict(self, keep: Optional[str] = None):
+        if len(self._keys) <= self.max_titles:
+            return
+        # 一次淘汰到容量以下一段距离，使淘汰的开销摊到多次插入上；
+        # 刚写入的标题不参与淘汰，使用次数相同时先淘汰较早加入的标题
+        target = int(self.max_titles * (1 - EVICT_FRACTION))
+        by_uses = sorted(
+            (key for key in self._titles if key != keep), key=lambda key: self._titles[key][2]
+        )
+        evicted = set(by_uses[:len(self._keys) - target])
+        for key in evicted:
+            for todo_id in self._titles.pop(key)[1]:
+                self._by_id.pop(todo_id, None)
+        self._keys = [key for key in self._keys if key not in evicted]
+        for key in evicted:
+            self._demote(key)
+        self._weight *= 2
+        if self._weight > AGING_RESCALE:
+            self._weight /= AGING_RESCALE
+            for entry in self._titles.values():
+                entry[2] /= AGING_RESCALE
+
+title_index = TitleIndex()
+
+def load_titles(db: Session):
+    """启动时从未删除的待办事项构建索引"""
+    title_index.load(db.execute(
+        select(models.Todo.id, models.Todo.title).where(models.Todo.deleted_at.is_(None))
+    ).tuples())
@@ -1,56 +1,517 @@
 from sqlalchemy.orm import Session
-from sqlalchemy import and_, or_
+from sqlalchemy import (
+    and_, or_, not_, bindparam, case, column, false, func, literal, literal_column, table, text, type_coerce,
+    delete, insert, select, update, Integer, Row, String
+)
 from datetime import datetime
-from typing import Optional, List
-from . import models, schemas
+from functools import lru_cache
+import operator
+import time
+from typing import Optional, List, Union
+import base64
+import binascii
+import json
+from . import autocomplete, models, schemas
 
-def get_todo(db: Session, todo_id: int) -> Optional[models.Todo]:
-    """获取单个待办事项"""
-    return db.query(models.Todo).filter(models.Todo.id == todo_id).first()
+# SQLAlchemy 在 SQLite 中写入 DateTime 使用的文本格式
+_SQLITE_DATETIME_FORMAT = "%Y-%m-%d %H:%M:%S.%f"
+
+# 未被软删除的记录；所有读写查询都带上该条件，以命中 deleted_at IS NULL 的部分索引
+_LIVE = models.Todo.deleted_at.is_(None)
+
+# 物理移除（归档、清理墓碑）时跳过热表中 id 最大的一行：SQLite 的新 rowid 取当前最大值 + 1，
+# 保留这一行可以保证被移走的 id 不会再分配给新任务
+_BELOW_MAX_ID = models.Todo.id < select(func.max(models.Todo.id)).scalar_subquery()
+
+# 列表预览模式下描述保留的字符数
+DESCRIPTION_PREVIEW_LENGTH = 100
+
+# 旧版 SQLite 单条语句最多 999 个绑定参数，按 id 列表分片时留出余量
+MAX_IDS_PER_STATEMENT = 900
+
+# 分片批量操作在两片之间的停顿（秒），让在 busy handler 中等待写锁的其他连接有机会拿到锁
+BATCH_CHUNK_PAUSE = 0.005
+
+# 可排序的列；只有 due_date 可能为空（SQLite 升序时 NULL 在前，倒序时在后）
+SORT_COLUMNS = ("created_at", "updated_at", "due_date", "priority")
+_NULLABLE_SORT_COLUMNS = {"due_date"}
+
+# 列表的范围过滤参数：参数名 -> (列名, 比较运算)
+RANGE_FILTERS = {
+    "priority_min": ("priority", operator.ge),
+    "priority_max": ("priority", operator.le),
+    "due_after": ("due_date", operator.ge),
+    "due_before": ("due_date", operator.lt),
+}
+
+def resolve_sort(status: str = "all", sort: Optional[str] = None, order: Optional[str] = None) -> tuple[str, bool]:
+    """确定排序列和方向，返回 (列名, 是否倒序)；默认 overdue 按 due_date、其余按 created_at，due_date 升序、其他列倒序"""
+    if sort is None:
+        sort = "due_date" if status == "overdue" else "created_at"
+    if order is None:
+        order = "asc" if sort == "due_date" else "desc"
+    return sort, order == "desc"
+
+def encode_cursor(todo: models.Todo, sort: str = "created_at") -> str:
+    """把一条待办事项的排序键 (sort 列的值, id) 编码为不透明游标"""
+    value = getattr(todo, sort)
+    if isinstance(value, datetime):
+        value = value.strftime(_SQLITE_DATETIME_FORMAT)
+    raw = json.dumps([sort, value, todo.id])
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+def decode_cursor(cursor: str, sort: str = "created_at") -> tuple:
+    """解析游标，返回 (排序键的值, id)；格式不合法或与 sort 不匹配时抛出 ValueError"""
+    try:
+        column, value, todo_id = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        if column != sort:
+            raise ValueError("Cursor belongs to another sort order")
+        if value is not None:
+            value = int(value) if sort == "priority" else datetime.strptime(value, _SQLITE_DATETIME_FORMAT)
+        elif sort not in _NULLABLE_SORT_COLUMNS:
+            raise ValueError("Unexpected null sort key")
+        return value, int(todo_id)
+    except (binascii.Error, UnicodeError, TypeError, ValueError) as exc:
+        raise ValueError("Invalid cursor") from exc
+
+def _datetime_text_forms(value: datetime) -> list[str]:
+    """同一时间点在 SQLite 中可能出现的文本形式
+
+    默认值 func.now() 写入的是不带微秒的 CURRENT_TIMESTAMP，
+    而 SQLAlchemy 绑定的 datetime 总是带六位微秒，两者需要按同一时间点比较。
+    """
+    forms = [value.strftime(_SQLITE_DATETIME_FORMAT)]
+    if value.microsecond == 0:
+        forms.insert(0, value.strftime("%Y-%m-%d %H:%M:%S"))
+    return forms
+
+def _after_cursor(column, id_column, descending: bool, keyset: str):
+    """键集分页条件：按 (column, id) 排序时排在游标之后的记录，游标值由 _cursor_params 绑定
+
+    keyset 为 "value" / "null" 表示游标行的排序键非空 / 为空，"rest" 表示游标所在段之后的另一段（见 _next_keyset）。
+    """
+    # 可为空的列在索引中分成 NULL 和非空两段，条件只覆盖一段
+    if keyset == "rest":
+        return column.is_(None) if descending else column.isnot(None)
+    cursor_id = bindparam("cursor_id")
+    if keyset == "null":
+        return and_(column.is_(None), id_column < cursor_id if descending else id_column > cursor_id)
+    
+    if isinstance(column.type, Integer):
+        value = bindparam("cursor_value")
+        before, equal, after = column < value, column == value, column > value
+        lowest, highest = column >= value, column <= value
+    else:
+        # 时间列按文本比较，同时匹配带微秒和不带微秒的两种写法
+        text_column = type_coerce(column, String)
+        before = text_column < bindparam("cursor_first")
+        equal = text_column.in_(bindparam("cursor_forms", expanding=True))
+        after = text_column > bindparam("cursor_last")
+        lowest, highest = text_column >= bindparam("cursor_first"), text_column <= bindparam("cursor_last")
+    
+    # OR 条件无法用于索引定位，冗余的单列边界让 SQLite 从游标处开始 SEARCH 而不是从头 SCAN
+    if descending:
+        return and_(highest, or_(before, and_(equal, id_column < cursor_id)))
+    return and_(lowest, or_(after, and_(equal, id_column > cursor_id)))
+
+def _next_keyset(sort: str, descending: bool, keyset: Optional[str], not_null: bool = False) -> Optional[str]:
+    """游标所在段读完后还需要接着读的段；NULL 升序在前、倒序在后
+
+    只有可为空的列有第二段；not_null 表示过滤条件已经排除了排序列为空的记录。
+    """
+    if sort in _NULLABLE_SORT_COLUMNS and not not_null and keyset == ("value" if descending else "null"):
+        return "rest"
+    return None
+
+def _cursor_params(value, todo_id: int) -> dict:
+    params = {"cursor_value": value, "cursor_id": todo_id}
+    if isinstance(value, datetime):
+        forms = _datetime_text_forms(value)
+        params.update(cursor_first=forms[0], cursor_last=forms[-1], cursor_forms=forms)
+    return params
+
+class VersionConflict(Exception):
+    """If-Match 给出的版本与记录的当前版本不一致"""
+
+def _if_version(expected_versions: Optional[List[int]]) -> list:
+    """条件更新的版本条件；expected_versions 为 None 表示不检查版本"""
+    if expected_versions is None:
+        return []
+    return [models.Todo.version.in_(expected_versions)]
+
+def _check_version(db: Session, todo_id: int, expected_versions: Optional[List[int]]):
+    """条件更新没有命中任何行时区分记录不存在和版本冲突，后者抛出 VersionConflict"""
+    if expected_versions is None:
+        return
+    if get_todo(db, todo_id) is not None or get_archived_todo(db, todo_id) is not None:
+        raise VersionConflict(todo_id)
+
+def _restore_archived(db: Session, criteria: list, deleted_at: Optional[datetime] = None) -> List[Row]:
+    """把满足 criteria 的归档记录移回 todos（不提交），返回移回记录的 (id, title)
+
+    deleted_at 不为空时以墓碑形式移回，删除由同步接口报告，之后交给 purge_deleted_todos 清理。
+    归档表删除和 todos 插入各自的计数触发器相互抵消（墓碑不计入），统计保持一致。
+    """
+    archive = models.TodoArchive.__table__
+    columns = [column.name for column in archive.columns]
+    source = [
+        literal(deleted_at, archive.c.deleted_at.type).label(name) if name == "deleted_at" else archive.c[name]
+        for name in columns
+    ]
+    todos = models.Todo.__table__
+    restored = db.execute(
+        insert(todos).from_select(columns, select(*source).where(*criteria))
+        .returning(todos.c.id, todos.c.title)
+    ).all()
+    if restored:
+        db.execute(delete(archive).where(*criteria))
+    return restored
+
+def _restore_archived_ids(db: Session, todo_ids: List[int]) -> List[Row]:
+    """把指定 id 中已归档的记录移回 todos（不提交），id 列表按 MAX_IDS_PER_STATEMENT 分片"""
+    restored = []
+    for start in range(0, len(todo_ids), MAX_IDS_PER_STATEMENT):
+        criteria = [models.TodoArchive.id.in_(todo_ids[start:start + MAX_IDS_PER_STATEMENT])]
+        # 先只读地检查，没有归档记录时不写入，也就不提前占用写锁
+        if db.scalar(select(models.TodoArchive.id).where(*criteria).limit(1)) is not None:
+            restored += _restore_archived(db, criteria)
+    return restored
+
+def _write_through_archive(db: Session, todo_id: int, write):
+    """执行针对 todos 的条件写入 write() 并提交，返回其结果
+
+    没有命中且记录已归档时，先把它移回 todos 再写一次，修改、切换和删除因此同样作用于归档任务；
+    回到热表的任务由归档任务按完成时间重新判断是否归档，并重新进入补全索引。
+    移回后仍未命中（版本冲突）时回滚，记录留在归档表。
+    """
+    result = write()
+    restored = None if result else _restore_archived(db, [models.TodoArchive.id == todo_id])
+    if restored:
+        result = write()
+        if not result:
+            db.rollback()
+    db.commit()
+    if restored and result:
+        autocomplete.title_index.add(todo_id, restored[0].title)
+    return result
+
+def _overdue_criteria(model, now) -> list:
+    """已过截止日期的未完成任务，可在 ix_todos_completed_due_date_id 上做范围扫描"""
+    return [model.is_completed == False, model.due_date.isnot(None), model.due_date < now]
+
+# 热点读取使用预先构建的语句，参数全部通过 bindparam 传入。
+# 同一个语句对象在进程内反复执行，SQLAlchemy 只在第一次编译，之后直接命中编译缓存，
+# 也省去了每次请求构造 ORM Query 的开销。
+# 只读查询选取表的列（Core）而不是 ORM 实体，返回轻量的 Row，
+# 不进入 identity map，也没有属性插桩，可以直接交给响应模型序列化
+_GET_TODO = select(models.Todo.__table__).where(models.Todo.id == bindparam("todo_id"), _LIVE)
+_GET_ARCHIVED_TODO = select(models.TodoArchive.__table__).where(
+    models.TodoArchive.id == bindparam("todo_id")
+)
+_OVERDUE_COUNT = select(func.count(models.Todo.id)).where(
+    _LIVE, *_overdue_criteria(models.Todo, bindparam("now"))
+)
+
+def _unindexed(model, column: str):
+    """带一元 + 的列引用，SQLite 不会为这一列上的条件或排序选用索引"""
+    return literal_column(f"+{model.__tablename__}.{column}", getattr(model, column).type)
+
+# fields 的组合来自请求参数，缓存设上限
+@lru_cache(maxsize=256)
+def _list_statements(
+    archived: bool, status: str, sort: str, descending: bool, keyset: Optional[str] = None,
+    fields: Optional[tuple] = None, description_preview: bool = False, range_filters: tuple = ()
+):
+    """按查询参数的组合构建 (列表语句, 计数语句)，每种组合只构建一次；keyset 的取值见 _after_cursor"""
+    if archived:
+        model = models.TodoArchive
+        criteria = []
+    else:
+        model = models.Todo
+        criteria = [_LIVE]
+    
+    # 根据状态过滤；归档表中都是已完成的任务，不需要条件
+    if status == "completed":
+        if not archived:
+            criteria.append(model.is_completed == True)
+    elif status == "pending":
+        criteria.append(model.is_completed == False)
+    elif status == "overdue":
+        criteria.extend(_overdue_criteria(model, bindparam("now")))
+    # 范围过滤只用一个 (列, id) 索引定位：优先用排序列，否则用第一个被过滤的列。
+    # 其余列加一元 +，SQLite 不把它们当作索引约束，只在读出的行上过滤
+    range_columns = list(dict.fromkeys(RANGE_FILTERS[name][0] for name in range_filters))
+    if status == "overdue":
+        range_columns.append("due_date")
+    seek = sort if sort in range_columns else next(iter(range_columns), sort)
+    for name in range_filters:
+        column, compare = RANGE_FILTERS[name]
+        target = _unindexed(model, column) if column != seek else getattr(model, column)
+        criteria.append(compare(target, bindparam(name)))
+    
+    count_stmt = select(func.count(model.id)).where(*criteria)
+    
+    # 分页和排序，id 作为排序键相同时的稳定次序。
+    # 排序列不是定位用的列时同样加 +，免得规划器顺着排序列的索引整表扫描；
+    # 范围内的记录改为临时排序
+    sort_column = getattr(model, sort) if sort == seek else _unindexed(model, sort)
+    if descending:
+        order_by = (sort_column.desc(), model.id.desc())
+    else:
+        order_by = (sort_column.asc(), model.id.asc())
+    if keyset is not None:
+        id_column = model.id if sort == seek else _unindexed(model, "id")
+        criteria.append(_after_cursor(sort_column, id_column, descending, keyset))
+    # fields 之外另选排序键和 id，用于生成游标
+    if fields is None:
+        columns = list(model.__table__.columns)
+    else:
+        names = dict.fromkeys([*fields, sort_column.key, "id"])
+        columns = [model.__table__.c[name] for name in names]
+    if description_preview:
+        columns = [
+            func.substr(column, 1, bindparam("preview_length")).label("description")
+            if column.key == "description" else column
+            for column in columns
+        ]
+    list_stmt = select(*columns).where(*criteria).order_by(*order_by).offset(
+        bindparam("skip")
+    ).limit(bindparam("limit"))
+    
+    return list_stmt, count_stmt
+
+def get_todo(db: Session, todo_id: int) -> Optional[Row]:
+    """获取单个待办事项（只读 Row）"""
+    return db.execute(_GET_TODO, {"todo_id": todo_id}).first()
+
+def get_archived_todo(db: Session, todo_id: int) -> Optional[Row]:
+    """从归档表获取单个待办事项（只读 Row）"""
+    return db.execute(_GET_ARCHIVED_TODO, {"todo_id": todo_id}).first()
 
 def get_todos(
     db: Session, 
     status: str = "all", 
     skip: int = 0, 
-    limit: int = 10
-) -> tuple[List[models.Todo], int]:
-    """获取待办事项列表"""
-    query = db.query(models.Todo)
+    limit: int = 10,
+    cursor: Optional[str] = None,
+    include_total: bool = True,
+    archived: bool = False,
+    fields: Optional[List[str]] = None,
+    description_preview: bool = False,
+    sort: Optional[str] = None,
+    order: Optional[str] = None,
+    priority_min: Optional[int] = None,
+    priority_max: Optional[int] = None,
+    due_after: Optional[datetime] = None,
+    due_before: Optional[datetime] = None
+) -> tuple[List[Row], Optional[int]]:
+    """获取待办事项列表（只读 Row），返回 (列表, 总数)
+
+    按 (sort, id) 排序，sort 和 order 的默认值见 resolve_sort。传入 cursor 时从游标之后读取并忽略 skip，
+    游标无效或属于其他排序列时抛出 ValueError。include_total 为 False 时总数为 None。
+    status 为 completed 时热表之后接着列出归档任务；archived 为 True 时只查归档表。
+    fields 指定时只返回这些列（另含排序键和 id），description_preview 时描述截断为前 DESCRIPTION_PREVIEW_LENGTH 个字符。
+    priority_min/priority_max 为闭区间，due_after/due_before 为 [after, before)。
+    """
+    # 归档表中只有已完成的任务
+    if archived and status in ("pending", "overdue"):
+        return [], 0 if include_total else None
+    params = {
+        "now": datetime.now(), "skip": skip, "limit": limit,
+        "preview_length": DESCRIPTION_PREVIEW_LENGTH
+    }
+    ranges = {
+        "priority_min": priority_min, "priority_max": priority_max,
+        "due_after": due_after, "due_before": due_before,
+    }
+    ranges = {name: value for name, value in ranges.items() if value is not None}
+    params.update(ranges)
+    sort, descending = resolve_sort(status, sort, order)
+    keyset = None
+    if cursor is not None:
+        value, todo_id = decode_cursor(cursor, sort)
+        keyset = "null" if value is None else "value"
+        params.update(_cursor_params(value, todo_id), skip=0)
+    shape = (
+        tuple(sorted(fields)) if fields is not None else None,
+        description_preview,
+        tuple(ranges)
+    )
+    not_null = status == "overdue" or any(RANGE_FILTERS[name][0] == sort for name in ranges)
     
-    # 根据状态过滤
-    if status == "completed":
-        query = query.filter(models.Todo.is_completed == True)
-    elif status == "pending":
-        query = query.filter(models.Todo.is_completed == False)
+    def read(from_archive: bool, keyset: Optional[str], skip: int, limit: int) -> List[Row]:
+        list_stmt, _ = _list_statements(from_archive, status, sort, descending, keyset, *shape)
+        rows = db.execute(list_stmt, {**params, "skip": skip, "limit": limit}).all()
+        # 游标所在段不足一页时，从索引中相邻的另一段开头继续读取
+        next_keyset = _next_keyset(sort, descending, keyset, not_null)
+        if next_keyset is not None and len(rows) < limit:
+            rest_stmt, _ = _list_statements(from_archive, status, sort, descending, next_keyset, *shape)
+            rows += db.execute(rest_stmt, {**params, "skip": 0, "limit": limit - len(rows)}).all()
+        return rows
+    
+    def count(from_archive: bool) -> int:
+        return db.scalar(_list_statements(from_archive, status, sort, descending, None, *shape)[1], params)
     
-    # 获取总数
-    total = query.count()
+    # 已完成列表读完热表后接着读归档表；游标行已归档时说明热表已经读完
+    spill = status == "completed" and not archived
+    from_archive = archived or (
+        spill and keyset is not None and get_archived_todo(db, params["cursor_id"]) is not None
+    )
+    total = None
+    if include_total:
+        total = count(False) + count(True) if spill else count(archived)
     
-    # 分页和排序
-    todos = query.order_by(models.Todo.created_at.desc()).offset(skip).limit(limit).all()
+    todos = read(from_archive, keyset, params["skip"], limit)
+    if spill and not from_archive and len(todos) < limit:
+        archive_skip = 0 if todos or keyset is not None else params["skip"] - count(False)
+        todos += read(True, None, archive_skip, limit - len(todos))
     
     return todos, total
 
+# 全文检索：todos_fts 的 rowid 即 todos.id，按 BM25 排序（分数越小越相关），标题权重高于描述
+_TODOS_FTS = table("todos_fts", column("rowid"))
+_FTS_JOIN = _TODOS_FTS.join(models.Todo.__table__, models.Todo.id == _TODOS_FTS.c.rowid)
+_FTS_MATCH = text("todos_fts MATCH :query")
+_SEARCH = select(models.Todo.__table__).select_from(_FTS_JOIN).where(_FTS_MATCH, _LIVE).order_by(
+    text("bm25(todos_fts, 10.0, 1.0)"), models.Todo.id
+).offset(bindparam("skip")).limit(bindparam("limit"))
+_SEARCH_COUNT = select(func.count()).select_from(_FTS_JOIN).where(_FTS_MATCH, _LIVE)
+
+def fts_query(q: str) -> str:
+    """把用户输入转换为 FTS5 查询
+
+    每个词加引号按短语匹配、词之间为 AND，输入中的引号、运算符不会造成语法错误。
+    """
+    return " ".join('"' + term.replace('"', '""') + '"' for term in q.split())
+
+def search_todos(
+    db: Session, q: str, skip: int = 0, limit: int = 10, include_total: bool = True
+) -> tuple[List[Row], Optional[int]]:
+    """全文检索标题和描述，按相关度排序（只读 Row）"""
+    query = fts_query(q)
+    if not query:
+        return [], 0 if include_total else None
+    params = {"query": query, "skip": skip, "limit": limit}
+    total = db.scalar(_SEARCH_COUNT, params) if include_total else None
+    return db.execute(_SEARCH, params).all(), total
+
+# 容错搜索：先用三元组索引取出至少共享一个三元组的候选（按 BM25 取前 FUZZY_CANDIDATES 条），
+# 再在内存中按三元组相似度重新排序并过滤。两个字的查询（常见于中文）凑不出三元组，
+# 改为在三元组词表中按前缀查找包含这两个字的标题，候选按 id 从新到旧取
+FUZZY_CANDIDATES = 200
+FUZZY_MIN_SIMILARITY = 0.2
+
+_TITLE_TRIGRAM = table("todos_title_trigram", column("rowid"))
+_FUZZY_SEARCH = select(models.Todo.__table__).select_from(
+    _TITLE_TRIGRAM.join(models.Todo.__table__, models.Todo.id == _TITLE_TRIGRAM.c.rowid)
+).where(text("todos_title_trigram MATCH :query"), _LIVE).order_by(
+    text("bm25(todos_title_trigram)")
+).limit(bindparam("limit"))
+
+_TITLE_TRIGRAM_TERMS = table("todos_title_trigram_terms", column("term"), column("doc"))
+_BIGRAM_SEARCH = select(models.Todo.__table__).where(
+    models.Todo.id.in_(
+        select(_TITLE_TRIGRAM_TERMS.c.doc).where(
+            _TITLE_TRIGRAM_TERMS.c.term >= bindparam("prefix"),
+            _TITLE_TRIGRAM_TERMS.c.term < bindparam("prefix_end")
+        )
+    ),
+    _LIVE
+).order_by(models.Todo.id.desc()).limit(bindparam("limit"))
+
+def _trigrams(value: str) -> set:
+    """pg_trgm 风格的三元组：按空白分词，词前补两个空格、词后补一个空格，使词首词尾也参与比较"""
+    grams = set()
+    for word in value.lower().split():
+        padded = f"  {word} "
+        grams.update(padded[i:i + 3] for i in range(len(padded) - 2))
+    return grams
+
+def title_similarity(a: str, b: str) -> float:
+    """两个标题三元组集合的 Jaccard 相似度，取值 0 到 1"""
+    left, right = _trigrams(a), _trigrams(b)
+    if not left or not right:
+        return 0.0
+    return len(left & right) / len(left | right)
+
+def fuzzy_search_todos(
+    db: Session, q: str, skip: int = 0, limit: int = 10,
+    min_similarity: float = FUZZY_MIN_SIMILARITY
+) -> tuple[List[Row], Optional[int]]:
+    """按标题容错搜索，返回按相似度排序的一页结果和达到阈值的总数
+
+    查询至少需要 2 个字符；候选只通过三元组索引获取，不会退化为 LIKE 全表扫描。
+    两个字的查询只返回标题中包含这两个字的记录，不再按相似度阈值过滤。
+    候选最多取 FUZZY_CANDIDATES 条，取满时无法得知真实匹配数，总数返回 None，
+    超出候选范围的结果也不会出现在后面的页中。
+    """
+    text_value = q.strip().lower()
+    if len(text_value) == 2:
+        candidates = db.execute(_BIGRAM_SEARCH, {
+            "prefix": text_value, "prefix_end": text_value + "\U0010ffff", "limit": FUZZY_CANDIDATES
+        }).all()
+        min_similarity = 0.0
+    else:
+        grams = dict.fromkeys(text_value[i:i + 3] for i in range(len(text_value) - 2))
+        if not grams:
+            return [], 0
+        query = " OR ".join('"' + gram.replace('"', '""') + '"' for gram in grams)
+        candidates = db.execute(_FUZZY_SEARCH, {"query": query, "limit": FUZZY_CANDIDATES}).all()
+    
+    scored = [(title_similarity(q, todo.title), todo) for todo in candidates]
+    scored = [item for item in scored if item[0] >= min_similarity]
+    scored.sort(key=lambda item: (-item[0], item[1].id))
+    total = len(scored) if len(candidates) < FUZZY_CANDIDATES else None
+    return [todo for _, todo in scored[skip:skip + limit]], total
+
 def create_todo(db: Session, todo: schemas.TodoCreate) -> models.Todo:
-    """创建新的待办事项"""
-    db_todo = models.Todo(
-        title=todo.title,
-        description=todo.description,
-        priority=todo.priority,
-        due_date=todo.due_date
-    )
-    db.add(db_todo)
+    """创建新的待办事项
+
+    INSERT ... RETURNING 直接带回数据库生成的 id 和时间戳，无需再 refresh。
+    """
+    stmt = insert(models.Todo).values(**todo.model_dump()).returning(models.Todo)
+    db_todo = db.scalars(stmt).one()
+    # 在提交前读取，提交后访问属性会因过期而重新查询
+    todo_id, title = db_todo.id, db_todo.title
     db.commit()
-    db.refresh(db_todo)
+    autocomplete.title_index.add(todo_id, title)
     return db_todo
 
-def update_todo(db: Session, todo_id: int, todo_update: schemas.TodoUpdate) -> Optional[models.Todo]:
-    """更新待办事项"""
-    db_todo = get_todo(db, todo_id)
-    if not db_todo:
-        return None
+def bulk_create_todos(db: Session, todos: List[schemas.TodoCreate]) -> List[int]:
+    """批量创建待办事项，返回按输入顺序排列的新 id
+
+    所有行通过一次 executemany 在同一事务中插入。事务持有写锁期间
+    SQLite 为新行连续分配 rowid，因此可以由 last_insert_rowid() 推算出全部 id。
+    """
+    if not todos:
+        return []
     
+    db.execute(insert(models.Todo.__table__), [todo.model_dump() for todo in todos])
+    last_id = db.execute(select(func.last_insert_rowid())).scalar()
+    db.commit()
+    todo_ids = list(range(last_id - len(todos) + 1, last_id + 1))
+    for todo_id, todo in zip(todo_ids, todos):
+        autocomplete.title_index.add(todo_id, todo.title)
+    return todo_ids
+
+def update_todo(
+    db: Session, todo_id: int, todo_update: schemas.TodoUpdate,
+    expected_versions: Optional[List[int]] = None
+) -> Optional[models.Todo]:
+    """更新待办事项
+
+    只执行一条 UPDATE ... RETURNING，不存在时返回 None；已归档的任务先移回 todos 再更新。
+    给出 expected_versions 时版本检查和版本号递增在同一条条件 UPDATE 中完成，
+    版本不匹配时抛出 VersionConflict。
+    """
     update_data = todo_update.model_dump(exclude_unset=True)
+    if not update_data:
+        db_todo = get_todo(db, todo_id)
+        if db_todo is None:
+            db_todo = get_archived_todo(db, todo_id)
+        if db_todo is not None and expected_versions is not None and db_todo.version not in expected_versions:
+            raise VersionConflict(todo_id)
+        return db_todo
     
     # 如果状态改为完成，设置完成时间
     if "is_completed" in update_data:
@@ -59,81 +520,339 @@ def update_todo(db: Session, todo_id: int, todo_update: schemas.TodoUpdate) -> O
         else:
             update_data["completed_at"] = None
     
-    for field, value in update_data.items():
-        setattr(db_todo, field, value)
+    stmt = update(models.Todo).where(
+        models.Todo.id == todo_id, _LIVE, *_if_version(expected_versions)
+    ).values(**update_data).returning(models.Todo).execution_options(populate_existing=True)
     
-    db.commit()
-    db.refresh(db_todo)
+    db_todo = _write_through_archive(db, todo_id, lambda: db.execute(stmt).scalar_one_or_none())
+    if db_todo is None:
+        _check_version(db, todo_id, expected_versions)
+    if db_todo is not None and "title" in update_data:
+        autocomplete.title_index.rename(todo_id, update_data["title"])
     return db_todo
 
-def toggle_todo(db: Session, todo_id: int) -> Optional[models.Todo]:
-    """切换待办事项完成状态"""
-    db_todo = get_todo(db, todo_id)
-    if not db_todo:
-        return None
+def bulk_update_todos(db: Session, items: List[schemas.TodoBulkUpdateItem]) -> List[Union[bool, VersionConflict]]:
+    """在一个事务中批量更新待办事项，逐项返回 True（已更新）、False（未找到）或 VersionConflict
+
+    同一 id 的多次修改先按顺序合并，给出的 version 合并为该 id 可接受的版本集合；
+    再按修改的字段集合和版本个数分组，每组一条 UPDATE 语句用 executemany 执行，
+    语句本身带有未删除条件和 version IN 条件。
+    """
+    merged: dict[int, dict] = {}
+    versions: dict[int, set[int]] = {}
+    for item in items:
+        merged.setdefault(item.id, {}).update(item.changes.model_dump(exclude_unset=True))
+        if item.version is not None:
+            versions.setdefault(item.id, set()).add(item.version)
     
-    db_todo.is_completed = not db_todo.is_completed
-    if db_todo.is_completed:
-        db_todo.completed_at = datetime.now()
-    else:
-        db_todo.completed_at = None
+    completed_at = datetime.now()
+    groups: dict[tuple, list[dict]] = {}
+    for todo_id, values in merged.items():
+        if not values:
+            continue
+        if "is_completed" in values:
+            values["completed_at"] = completed_at if values["is_completed"] else None
+        expected = sorted(versions.get(todo_id, ()))
+        params = {"todo_id": todo_id, **values, **{f"version_{i}": v for i, v in enumerate(expected)}}
+        groups.setdefault((tuple(sorted(values)), len(expected)), []).append(params)
+    
+    ids = list(merged)
+    # 已归档的任务先移回 todos，与单条更新一致
+    restored = _restore_archived_ids(db, ids)
+    table = models.Todo.__table__
+    conflicts = set()
+    if versions:
+        # 空 UPDATE 让本事务先持有 SQLite 写锁，此后读到的版本号就是下面各条 UPDATE 看到的版本号
+        db.execute(update(table).where(false()))
+        versioned = list(versions)
+        for start in range(0, len(versioned), MAX_IDS_PER_STATEMENT):
+            chunk = versioned[start:start + MAX_IDS_PER_STATEMENT]
+            conflicts.update(
+                todo_id for todo_id, version in db.execute(
+                    select(table.c.id, table.c.version).where(table.c.id.in_(chunk), table.c.deleted_at.is_(None))
+                )
+                if version not in versions[todo_id]
+            )
     
+    for (_, count), params in groups.items():
+        stmt = update(table).where(table.c.id == bindparam("todo_id"), table.c.deleted_at.is_(None))
+        if count:
+            stmt = stmt.where(table.c.version.in_([bindparam(f"version_{i}") for i in range(count)]))
+        db.execute(stmt, params)
+    
+    # 是否找到在所有 UPDATE 之后、提交之前读取：第一条 UPDATE 起本事务已持有写锁，
+    # 此时仍未删除的记录正是 UPDATE 看到的记录，期间被软删除的记录不会被修改也不会报告成功
+    existing = set()
+    for start in range(0, len(ids), MAX_IDS_PER_STATEMENT):
+        existing.update(db.scalars(
+            select(models.Todo.id).where(
+                models.Todo.id.in_(ids[start:start + MAX_IDS_PER_STATEMENT]), _LIVE
+            )
+        ))
     db.commit()
-    db.refresh(db_todo)
+    
+    for row in restored:
+        autocomplete.title_index.add(row.id, row.title)
+    for todo_id in existing - conflicts:
+        if "title" in merged[todo_id]:
+            autocomplete.title_index.rename(todo_id, merged[todo_id]["title"])
+    return [
+        VersionConflict(item.id) if item.id in conflicts else item.id in existing
+        for item in items
+    ]
+
+def toggle_todo(
+    db: Session, todo_id: int, expected_versions: Optional[List[int]] = None
+) -> Optional[models.Todo]:
+    """切换待办事项完成状态
+
+    取反和完成时间在一条 UPDATE ... RETURNING 中完成（需要 SQLite 3.35+），
+    不需要先查询再写回，并发切换时也不会互相覆盖。归档任务和版本检查的处理同 update_todo。
+    """
+    stmt = update(models.Todo).where(
+        models.Todo.id == todo_id, _LIVE, *_if_version(expected_versions)
+    ).values(
+        is_completed=not_(models.Todo.is_completed),
+        completed_at=case((models.Todo.is_completed == False, datetime.now()), else_=None)
+    ).returning(models.Todo).execution_options(populate_existing=True)
+    
+    db_todo = _write_through_archive(db, todo_id, lambda: db.execute(stmt).scalar_one_or_none())
+    if db_todo is None:
+        _check_version(db, todo_id, expected_versions)
     return db_todo
 
-def delete_todo(db: Session, todo_id: int) -> bool:
-    """删除待办事项"""
-    db_todo = get_todo(db, todo_id)
-    if not db_todo:
-        return False
+def delete_todo(db: Session, todo_id: int, expected_versions: Optional[List[int]] = None) -> bool:
+    """删除待办事项
+
+    只写入 deleted_at 墓碑（单行 UPDATE），物理删除交给 purge_deleted_todos。
+    已归档的任务先移回 todos 再写入墓碑。版本检查同 update_todo。
+    """
+    deleted = _write_through_archive(db, todo_id, lambda: db.query(models.Todo).filter(
+        models.Todo.id == todo_id, _LIVE, *_if_version(expected_versions)
+    ).update({models.Todo.deleted_at: datetime.now()}))
+    if not deleted:
+        _check_version(db, todo_id, expected_versions)
+    if deleted:
+        autocomplete.title_index.discard(todo_id)
+    return deleted > 0
+
+def get_deleted_todos(
+    db: Session, since: Optional[datetime] = None, since_id: Optional[int] = None, limit: int = 100
+) -> List[tuple[int, datetime]]:
+    """按 (deleted_at, id) 顺序返回墓碑 (id, deleted_at)，供同步客户端得知哪些记录已被删除
+
+    批量删除的记录共享同一个 deleted_at，只按时间翻页会跳过同一时刻的其余墓碑，
+    因此增量拉取以上一页最后一条的 (deleted_at, id) 作为 (since, since_id)。
+    只给出 since 时返回严格晚于该时间删除的记录；只给出 since_id 时抛出 ValueError。
+    """
+    if since_id is not None and since is None:
+        raise ValueError("since_id requires since")
+    query = db.query(models.Todo.id, models.Todo.deleted_at).filter(models.Todo.deleted_at.isnot(None))
+    if since is not None and since_id is not None:
+        # 冗余的 >= 边界让 OR 条件仍能在 ix_todos_deleted_at 上从 since 处开始范围扫描
+        query = query.filter(
+            models.Todo.deleted_at >= since,
+            or_(
+                models.Todo.deleted_at > since,
+                and_(models.Todo.deleted_at == since, models.Todo.id > since_id)
+            )
+        )
+    elif since is not None:
+        query = query.filter(models.Todo.deleted_at > since)
+    return query.order_by(models.Todo.deleted_at, models.Todo.id).limit(limit).all()
+
+def purge_deleted_todos(db: Session, deleted_before: datetime, chunk_size: int = 500) -> int:
+    """物理删除早于 deleted_before 的墓碑，每次最多 chunk_size 行并单独提交，返回删除总数"""
+    purged = 0
+    while True:
+        ids = db.scalars(
+            select(models.Todo.id)
+            .where(models.Todo.deleted_at.isnot(None), models.Todo.deleted_at < deleted_before, _BELOW_MAX_ID)
+            .limit(chunk_size)
+        ).all()
+        if not ids:
+            return purged
+        purged += db.execute(delete(models.Todo).where(models.Todo.id.in_(ids))).rowcount
+        db.commit()
+
+def archive_completed_todos(db: Session, completed_before: datetime, chunk_size: int = 500) -> int:
+    """把早于 completed_before 完成的待办事项移入归档表，返回归档总数
+
+    每片用 INSERT ... SELECT 复制到 todos_archive 后从 todos 删除，并在同一事务中提交。
+    补全索引只收录 todos 中的任务，归档的任务同时从索引中移除。
+    """
+    columns = [column.name for column in models.TodoArchive.__table__.columns]
+    archived = 0
+    while True:
+        ids = db.scalars(
+            select(models.Todo.id)
+            .where(
+                _LIVE,
+                models.Todo.is_completed == True,
+                models.Todo.completed_at < completed_before,
+                _BELOW_MAX_ID
+            )
+            .limit(chunk_size)
+        ).all()
+        if not ids:
+            return archived
+        db.execute(insert(models.TodoArchive).from_select(
+            columns,
+            select(*[models.Todo.__table__.c[name] for name in columns]).where(models.Todo.id.in_(ids))
+        ))
+        archived += db.execute(delete(models.Todo).where(models.Todo.id.in_(ids))).rowcount
+        db.commit()
+        autocomplete.title_index.discard_many(ids)
+
+def _run_batch(db: Session, criteria: list, values: dict, chunk_size: Optional[int] = None) -> List[int]:
+    """对满足 criteria 的未删除记录执行批量 UPDATE ... RETURNING id，返回受影响的 id
+
+    chunk_size 为空时整体执行一条语句；否则按 id 键集分片：每次取出下一批至多 chunk_size 个
+    匹配行的 id，对 (上一片末尾, 本片末尾] 区间执行语句，分片数只取决于匹配的行数，与 id 的疏密无关。
+    每片单独提交并稍作停顿，期间释放 SQLite 写锁，让等待中的其他写入可以插队。
+    """
+    criteria = [_LIVE, *criteria]
     
-    db.delete(db_todo)
-    db.commit()
-    return True
+    def apply(*conditions) -> List[int]:
+        return db.execute(
+            update(models.Todo).where(*criteria, *conditions).values(values).returning(models.Todo.id)
+        ).scalars().all()
+    
+    if not chunk_size:
+        affected = apply()
+        db.commit()
+        return affected
+    
+    affected = []
+    last_id = None
+    while True:
+        after = [] if last_id is None else [models.Todo.id > last_id]
+        ids = db.scalars(
+            select(models.Todo.id).where(*criteria, *after).order_by(models.Todo.id).limit(chunk_size)
+        ).all()
+        if not ids:
+            return affected
+        if last_id is not None:
+            time.sleep(BATCH_CHUNK_PAUSE)
+        affected += apply(*after, models.Todo.id <= ids[-1])
+        db.commit()
+        last_id = ids[-1]
 
-def batch_delete_completed(db: Session) -> int:
-    """批量删除已完成的待办事项"""
-    deleted_count = db.query(models.Todo).filter(models.Todo.is_completed == True).count()
-    db.query(models.Todo).filter(models.Todo.is_completed == True).delete()
-    db.commit()
-    return deleted_count
+def _delete_archived(db: Session, chunk_size: Optional[int] = None) -> List[int]:
+    """把归档表中的全部任务（都已完成）以墓碑形式移回 todos，返回移回的 id
 
-def batch_delete_all(db: Session) -> int:
-    """批量删除所有待办事项"""
-    deleted_count = db.query(models.Todo).count()
-    db.query(models.Todo).delete()
-    db.commit()
-    return deleted_count
-
-def batch_complete_all(db: Session) -> int:
-    """批量完成所有未完成的待办事项"""
-    updated_count = db.query(models.Todo).filter(models.Todo.is_completed == False).count()
-    db.query(models.Todo).filter(models.Todo.is_completed == False).update({
-        models.Todo.is_completed: True,
-        models.Todo.completed_at: datetime.now()
-    })
+    分片方式同 _run_batch；不分片时不提交，与随后热表上的 _run_batch 在同一事务中提交。
+    """
+    deleted_at = datetime.now()
+    if not chunk_size:
+        return [row.id for row in _restore_archived(db, [], deleted_at)]
+    
+    archive = models.TodoArchive.__table__
+    deleted = []
+    while True:
+        ids = db.scalars(select(archive.c.id).order_by(archive.c.id).limit(chunk_size)).all()
+        if not ids:
+            return deleted
+        if deleted:
+            time.sleep(BATCH_CHUNK_PAUSE)
+        deleted += [row.id for row in _restore_archived(db, [archive.c.id.in_(ids)], deleted_at)]
+        db.commit()
+
+def _batch_soft_delete(db: Session, criteria: list, chunk_size: Optional[int] = None) -> int:
+    """（软）删除归档表中的全部任务和 todos 中满足 criteria 的任务，并从补全索引中移除"""
+    deleted = _delete_archived(db, chunk_size)
+    deleted += _run_batch(db, criteria, {"deleted_at": datetime.now()}, chunk_size)
+    autocomplete.title_index.discard_many(deleted)
+    return len(deleted)
+
+def batch_delete_completed(db: Session, chunk_size: Optional[int] = None) -> int:
+    """批量（软）删除已完成的待办事项（包括已归档的），返回实际影响的行数"""
+    return _batch_soft_delete(db, [models.Todo.is_completed == True], chunk_size)
+
+def batch_delete_all(db: Session, chunk_size: Optional[int] = None) -> int:
+    """批量（软）删除所有待办事项（包括已归档的），返回实际影响的行数"""
+    return _batch_soft_delete(db, [], chunk_size)
+
+def batch_complete_all(db: Session, chunk_size: Optional[int] = None) -> int:
+    """批量完成所有未完成的待办事项，返回 UPDATE 实际影响的行数"""
+    return len(_run_batch(
+        db,
+        [models.Todo.is_completed == False],
+        {"is_completed": True, "completed_at": datetime.now()},
+        chunk_size
+    ))
+
+def _run_by_ids(db: Session, todo_ids: List[int], build) -> List[int]:
+    """对指定 id 执行集合式 DELETE/UPDATE ... RETURNING id，返回受影响的 id
+
+    id 列表按 MAX_IDS_PER_STATEMENT 分片，所有分片在同一事务中提交。
+    其中已归档的任务先移回 todos 再执行，与单条写入一致，并重新进入补全索引。
+    """
+    ids = list(dict.fromkeys(todo_ids))
+    restored = _restore_archived_ids(db, ids)
+    affected = []
+    for start in range(0, len(ids), MAX_IDS_PER_STATEMENT):
+        condition = and_(models.Todo.id.in_(ids[start:start + MAX_IDS_PER_STATEMENT]), _LIVE)
+        affected.extend(db.execute(build(condition).returning(models.Todo.id)).scalars())
     db.commit()
-    return updated_count
+    for row in restored:
+        autocomplete.title_index.add(row.id, row.title)
+    return affected
+
+def batch_complete_by_ids(db: Session, todo_ids: List[int]) -> List[int]:
+    """完成指定的未完成待办事项"""
+    completed_at = datetime.now()
+    return _run_by_ids(db, todo_ids, lambda condition: update(models.Todo).where(
+        condition, models.Todo.is_completed == False
+    ).values(is_completed=True, completed_at=completed_at))
+
+def batch_uncomplete_by_ids(db: Session, todo_ids: List[int]) -> List[int]:
+    """把指定的已完成待办事项恢复为未完成"""
+    return _run_by_ids(db, todo_ids, lambda condition: update(models.Todo).where(
+        condition, models.Todo.is_completed == True
+    ).values(is_completed=False, completed_at=None))
+
+def batch_delete_by_ids(db: Session, todo_ids: List[int]) -> List[int]:
+    """（软）删除指定的待办事项，并从补全索引中移除"""
+    deleted_at = datetime.now()
+    deleted = _run_by_ids(db, todo_ids, lambda condition: update(models.Todo).where(
+        condition
+    ).values(deleted_at=deleted_at))
+    autocomplete.title_index.discard_many(deleted)
+    return deleted
+
+def batch_set_priority_by_ids(db: Session, todo_ids: List[int], priority: int) -> List[int]:
+    """设置指定待办事项的优先级"""
+    return _run_by_ids(db, todo_ids, lambda condition: update(models.Todo).where(
+        condition
+    ).values(priority=priority))
 
 def get_todos_stats(db: Session) -> dict:
-    """获取待办事项统计信息"""
-    total = db.query(models.Todo).count()
-    completed = db.query(models.Todo).filter(models.Todo.is_completed == True).count()
-    pending = total - completed
-    
-    # 计算过期任务数量
-    now = datetime.now()
-    overdue = db.query(models.Todo).filter(
-        and_(
-            models.Todo.is_completed == False,
-            models.Todo.due_date < now
-        )
-    ).count()
+    """获取待办事项统计信息
+
+    总数和已完成数直接读取触发器维护的 todo_counters，其中包含归档表中的任务：
+    completed 等于 status=completed 列表的 total，total 等于 status=all 列表与 archived=true 列表的 total 之和。
+    过期数只在 (is_completed, due_date) 索引的过期区间上做范围计数。
+    """
+    counters = db.query(
+        models.TodoCounter.total, models.TodoCounter.completed
+    ).filter(models.TodoCounter.id == 1).first()
+    if counters is None:
+        # 计数行缺失时（例如被手工清理）退回到一次聚合扫描
+        counters = db.query(
+            func.count(models.Todo.id),
+            func.coalesce(func.sum(case((models.Todo.is_completed == True, 1), else_=0)), 0)
+        ).filter(_LIVE).one()
+        # 归档表中只有已完成的任务
+        archived = db.scalar(select(func.count(models.TodoArchive.id)))
+        counters = (counters[0] + archived, counters[1] + archived)
+    total, completed = counters
+    
+    overdue = db.scalar(_OVERDUE_COUNT, {"now": datetime.now()})
     
     return {
         "total": total,
         "completed": completed,
-        "pending": pending,
+        "pending": total - completed,
         "overdue": overdue
     }
@@ -12,7 +12,8 @@ engine = create_engine(
 )
 
 # 创建会话工厂
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+# 写操作通过 RETURNING 拿到最新数据，提交后无需再过期并重新查询
+SessionLocal = sessionmaker(autocommit=False, autoflush=False, expire_on_commit=False, bind=engine)
 
 # 创建基础模型类
 Base = declarative_base()
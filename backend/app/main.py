@@ -1,8 +1,11 @@
 from fastapi import FastAPI, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import JSONResponse
-from .database import engine, Base
+from contextlib import asynccontextmanager, suppress
+from .database import engine, Base, SessionLocal
 from .routes import todos
+from . import autocomplete, purge
+import asyncio
 import logging
 
 # 配置日志
@@ -12,13 +15,25 @@ logger = logging.getLogger(__name__)
 # 创建数据库表
 Base.metadata.create_all(bind=engine)
 
+# 应用生命周期：构建标题补全索引，启动后台墓碑清理任务
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    with SessionLocal() as db:
+        autocomplete.load_titles(db)
+    purger = asyncio.create_task(purge.run_purger())
+    yield
+    purger.cancel()
+    with suppress(asyncio.CancelledError):
+        await purger
+
 # 创建FastAPI应用
 app = FastAPI(
     title="TodoEveryday API",
     description="一个现代化的待办事项管理API",
     version="1.0.0",
     docs_url="/docs",
-    redoc_url="/redoc"
+    redoc_url="/redoc",
+    lifespan=lifespan
 )
 
 # 配置CORS
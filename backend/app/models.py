@@ -1,9 +1,10 @@
-from sqlalchemy import Column, Integer, String, Boolean, DateTime, Text
+from sqlalchemy import Column, Integer, String, Boolean, DateTime, Text, Index, DDL, event, literal_column, text
+from sqlalchemy.schema import CreateColumn, CreateIndex
 from sqlalchemy.sql import func
 from .database import Base
 
-class Todo(Base):
-    __tablename__ = "todos"
+class TodoColumns:
+    """todos 与归档表 todos_archive 共用的列定义"""
 
     id = Column(Integer, primary_key=True, index=True, autoincrement=True)
     title = Column(String(255), nullable=False)
@@ -14,3 +15,267 @@ class Todo(Base):
     updated_at = Column(DateTime, default=func.now(), onupdate=func.now())
     completed_at = Column(DateTime, nullable=True)
     due_date = Column(DateTime, nullable=True)
+    # 软删除墓碑：非空表示已删除，由后台清理任务定期物理删除
+    deleted_at = Column(DateTime, nullable=True)
+    # 乐观并发控制的版本号：每条 UPDATE 都在同一语句中加一，对外作为 ETag
+    version = Column(
+        Integer, nullable=False, default=1, server_default=text("1"),
+        onupdate=literal_column("version") + 1
+    )
+
+class Todo(TodoColumns, Base):
+    __tablename__ = "todos"
+
+    __table_args__ = (
+        # 列表默认排序 (status=all)：ORDER BY created_at DESC, id DESC
+        Index("ix_todos_created_at_id", "created_at", "id", sqlite_where=text("deleted_at IS NULL")),
+        # 按状态过滤后排序：WHERE is_completed = ? ORDER BY created_at DESC, id DESC
+        Index(
+            "ix_todos_completed_created_at_id",
+            "is_completed", "created_at", "id",
+            sqlite_where=text("deleted_at IS NULL"),
+        ),
+        # sort= 支持的其他排序列：全部列表用 (列, id)，按状态过滤时用 (is_completed, 列, id)，
+        # 正序和倒序都可以顺着同一个索引扫描。
+        # 过期统计和 overdue 列表也由 ix_todos_completed_due_date_id 的 (is_completed=0, due_date 区间) 范围扫描完成
+        *(
+            Index(name, *columns, sqlite_where=text("deleted_at IS NULL"))
+            for column in ("updated_at", "due_date", "priority")
+            for name, columns in (
+                (f"ix_todos_{column}_id", (column, "id")),
+                (f"ix_todos_completed_{column}_id", ("is_completed", column, "id")),
+            )
+        ),
+        # 墓碑：供同步查询和后台清理使用
+        Index("ix_todos_deleted_at", "deleted_at", sqlite_where=text("deleted_at IS NOT NULL")),
+        # 归档任务：按完成时间挑出较早完成的任务
+        Index(
+            "ix_todos_completed_at",
+            "completed_at",
+            sqlite_where=text("is_completed = 1 AND deleted_at IS NULL"),
+        ),
+    )
+
+class TodoArchive(TodoColumns, Base):
+    """已归档的待办事项：完成超过一定天数后从 todos 移入，结构与 todos 相同"""
+    __tablename__ = "todos_archive"
+
+    # 归档表只有已完成的任务，排序和范围过滤只需要 (列, id) 索引
+    __table_args__ = tuple(
+        Index(f"ix_todos_archive_{column}_id", column, "id")
+        for column in ("created_at", "updated_at", "due_date", "priority")
+    )
+
+class TodoCounter(Base):
+    """待办事项计数，单行表（id=1），由 todos 上的触发器在同一事务内维护"""
+    __tablename__ = "todo_counters"
+
+    id = Column(Integer, primary_key=True)
+    total = Column(Integer, nullable=False, default=0)
+    completed = Column(Integer, nullable=False, default=0)
+
+# 计数触发器：任何写入路径（ORM、批量语句）都会同步更新 todo_counters，
+# 软删除的记录不计入统计，归档表中的记录仍然计入
+TRIGGERS = {
+    "todos_counters_insert": """
+    CREATE TRIGGER todos_counters_insert AFTER INSERT ON todos
+    WHEN NEW.deleted_at IS NULL
+    BEGIN
+        UPDATE todo_counters
+        SET total = total + 1, completed = completed + NEW.is_completed
+        WHERE id = 1;
+    END
+    """,
+    "todos_counters_delete": """
+    CREATE TRIGGER todos_counters_delete AFTER DELETE ON todos
+    WHEN OLD.deleted_at IS NULL
+    BEGIN
+        UPDATE todo_counters
+        SET total = total - 1, completed = completed - OLD.is_completed
+        WHERE id = 1;
+    END
+    """,
+    "todos_counters_update": """
+    CREATE TRIGGER todos_counters_update AFTER UPDATE OF is_completed, deleted_at ON todos
+    WHEN OLD.is_completed IS NOT NEW.is_completed
+        OR (OLD.deleted_at IS NULL) IS NOT (NEW.deleted_at IS NULL)
+    BEGIN
+        UPDATE todo_counters
+        SET total = total + (NEW.deleted_at IS NULL) - (OLD.deleted_at IS NULL),
+            completed = completed
+                + (NEW.deleted_at IS NULL AND NEW.is_completed)
+                - (OLD.deleted_at IS NULL AND OLD.is_completed)
+        WHERE id = 1;
+    END
+    """,
+    "todos_archive_counters_insert": """
+    CREATE TRIGGER todos_archive_counters_insert AFTER INSERT ON todos_archive
+    BEGIN
+        UPDATE todo_counters
+        SET total = total + 1, completed = completed + NEW.is_completed
+        WHERE id = 1;
+    END
+    """,
+    "todos_archive_counters_delete": """
+    CREATE TRIGGER todos_archive_counters_delete AFTER DELETE ON todos_archive
+    BEGIN
+        UPDATE todo_counters
+        SET total = total - 1, completed = completed - OLD.is_completed
+        WHERE id = 1;
+    END
+    """,
+}
+
+# 三元组索引的内容来源：标题末尾补一个空格，使标题的最后两个字也落在某个三元组的开头，
+# 两个字的查询（如中文词语“报告”）可以按三元组前缀在词表中查到
+VIEWS = {
+    "todos_title_padded": """
+    CREATE VIEW todos_title_padded AS
+    SELECT id, title || ' ' AS title FROM todos
+    """,
+}
+
+# 全文索引：外部内容 FTS5 表，只保存倒排索引，原文从 todos 读取。
+# 软删除的记录仍在索引中，查询时与 todos 关联并过滤
+VIRTUAL_TABLES = {
+    "todos_fts": """
+    CREATE VIRTUAL TABLE todos_fts USING fts5(
+        title, description,
+        content='todos', content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2'
+    )
+    """,
+    # 标题三元组索引，用于容错（拼写错误）搜索；按字符切分，中文标题同样适用
+    "todos_title_trigram": """
+    CREATE VIRTUAL TABLE todos_title_trigram USING fts5(
+        title,
+        content='todos_title_padded', content_rowid='id',
+        tokenize='trigram'
+    )
+    """,
+}
+
+# FTS5 词表：逐条列出三元组索引中的词条和所在记录，按词条范围查询走索引，
+# 三元组分词器不处理少于三个字的查询，两个字的查询改为在这里按前缀查找
+VOCAB_TABLES = {
+    "todos_title_trigram_terms": """
+    CREATE VIRTUAL TABLE todos_title_trigram_terms USING fts5vocab(todos_title_trigram, 'instance')
+    """,
+}
+
+# 全文索引同步触发器：外部内容表删除旧词条时需要提供旧值
+TRIGGERS.update({
+    "todos_fts_insert": """
+    CREATE TRIGGER todos_fts_insert AFTER INSERT ON todos
+    BEGIN
+        INSERT INTO todos_fts (rowid, title, description) VALUES (NEW.id, NEW.title, NEW.description);
+    END
+    """,
+    "todos_fts_delete": """
+    CREATE TRIGGER todos_fts_delete AFTER DELETE ON todos
+    BEGIN
+        INSERT INTO todos_fts (todos_fts, rowid, title, description)
+        VALUES ('delete', OLD.id, OLD.title, OLD.description);
+    END
+    """,
+    "todos_fts_update": """
+    CREATE TRIGGER todos_fts_update AFTER UPDATE OF title, description ON todos
+    BEGIN
+        INSERT INTO todos_fts (todos_fts, rowid, title, description)
+        VALUES ('delete', OLD.id, OLD.title, OLD.description);
+        INSERT INTO todos_fts (rowid, title, description) VALUES (NEW.id, NEW.title, NEW.description);
+    END
+    """,
+    "todos_title_trigram_insert": """
+    CREATE TRIGGER todos_title_trigram_insert AFTER INSERT ON todos
+    BEGIN
+        INSERT INTO todos_title_trigram (rowid, title) VALUES (NEW.id, NEW.title || ' ');
+    END
+    """,
+    "todos_title_trigram_delete": """
+    CREATE TRIGGER todos_title_trigram_delete AFTER DELETE ON todos
+    BEGIN
+        INSERT INTO todos_title_trigram (todos_title_trigram, rowid, title) VALUES ('delete', OLD.id, OLD.title || ' ');
+    END
+    """,
+    "todos_title_trigram_update": """
+    CREATE TRIGGER todos_title_trigram_update AFTER UPDATE OF title ON todos
+    BEGIN
+        INSERT INTO todos_title_trigram (todos_title_trigram, rowid, title) VALUES ('delete', OLD.id, OLD.title || ' ');
+        INSERT INTO todos_title_trigram (rowid, title) VALUES (NEW.id, NEW.title || ' ');
+    END
+    """,
+})
+
+# 由 upgrade_schema 维护列和索引的表
+MANAGED_TABLES = [Todo.__table__, TodoArchive.__table__]
+
+# 已被其他索引取代、升级时从旧库删除的索引
+OBSOLETE_INDEXES = ["ix_todos_pending_due_date"]
+
+def _normalize_sql(sql: str) -> str:
+    return " ".join(sql.split())
+
+def _add_missing_columns(connection, table):
+    """给旧库中的表补上新增的列"""
+    existing = {row[1] for row in connection.exec_driver_sql(f"PRAGMA table_info({table.name})")}
+    for column in table.columns:
+        if column.name not in existing:
+            column_ddl = CreateColumn(column).compile(dialect=connection.dialect)
+            connection.exec_driver_sql(f"ALTER TABLE {table.name} ADD COLUMN {column_ddl}")
+
+def _sync_schema_objects(connection, object_type: str, expected: dict) -> list:
+    """按名称比对索引/触发器/虚拟表定义，缺失的创建，定义变化的删除后重建，返回新建的名称"""
+    current = {
+        name: _normalize_sql(sql or "")
+        for name, sql in connection.exec_driver_sql(
+            "SELECT name, sql FROM sqlite_master WHERE type = ?", (object_type,)
+        )
+    }
+    created = []
+    for name, sql in expected.items():
+        if current.get(name) == _normalize_sql(sql):
+            continue
+        if name in current:
+            connection.exec_driver_sql(f"DROP {object_type.upper()} {name}")
+        connection.exec_driver_sql(sql)
+        created.append(name)
+    return created
+
+@event.listens_for(Base.metadata, "after_create")
+def upgrade_schema(target, connection, **kw):
+    """把已存在的数据库升级到当前模型
+
+    create_all 只会创建缺失的表，这里补齐旧库的列、索引、全文索引、计数行和触发器。
+    计数行和全文索引只在创建时按现有数据生成，之后完全由触发器维护。
+    """
+    for table in MANAGED_TABLES:
+        _add_missing_columns(connection, table)
+    for name in OBSOLETE_INDEXES:
+        connection.exec_driver_sql(f"DROP INDEX IF EXISTS {name}")
+    _sync_schema_objects(connection, "index", {
+        index.name: str(CreateIndex(index).compile(dialect=connection.dialect))
+        for table in MANAGED_TABLES
+        for index in table.indexes
+    })
+    connection.execute(DDL("""
+    INSERT OR IGNORE INTO todo_counters (id, total, completed)
+    SELECT 1, COUNT(*), COALESCE(SUM(is_completed), 0) FROM (
+        SELECT is_completed FROM todos WHERE deleted_at IS NULL
+        UNION ALL
+        SELECT is_completed FROM todos_archive
+    )
+    """))
+    _sync_schema_objects(connection, "view", VIEWS)
+    for name in _sync_schema_objects(connection, "table", VIRTUAL_TABLES):
+        connection.exec_driver_sql(f"INSERT INTO {name} ({name}) VALUES ('rebuild')")
+    _sync_schema_objects(connection, "table", VOCAB_TABLES)
+    _sync_schema_objects(connection, "trigger", TRIGGERS)
+
+@event.listens_for(Base.metadata, "after_drop")
+def drop_virtual_tables(target, connection, **kw):
+    """drop_all 不认识虚拟表和视图，随模型表一起删除"""
+    for name in [*VOCAB_TABLES, *VIRTUAL_TABLES]:
+        connection.exec_driver_sql(f"DROP TABLE IF EXISTS {name}")
+    for name in VIEWS:
+        connection.exec_driver_sql(f"DROP VIEW IF EXISTS {name}")
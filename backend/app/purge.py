@@ -0,0 +1,58 @@
+"""后台维护任务：定期物理删除保留期已过的软删除记录，并归档较早完成的任务"""
+import asyncio
+import logging
+from datetime import datetime, timedelta
+from . import crud
+from .database import SessionLocal
+
+logger = logging.getLogger(__name__)
+
+# 墓碑保留时间，同步客户端需要在此期限内拉取删除记录
+TOMBSTONE_RETENTION = timedelta(days=7)
+# 清理间隔（秒）
+PURGE_INTERVAL_SECONDS = 3600
+# 每次提交删除的行数，保持单个事务足够短
+PURGE_CHUNK_SIZE = 500
+# 完成超过该时间的任务移入归档表，热表只保留活跃数据
+ARCHIVE_AFTER = timedelta(days=30)
+
+def purge_once() -> int:
+    """执行一次清理，返回物理删除的行数"""
+    db = SessionLocal()
+    try:
+        return crud.purge_deleted_todos(
+            db,
+            deleted_before=datetime.now() - TOMBSTONE_RETENTION,
+            chunk_size=PURGE_CHUNK_SIZE
+        )
+    finally:
+        db.close()
+
+def archive_once() -> int:
+    """执行一次归档，返回移入归档表的行数"""
+    db = SessionLocal()
+    try:
+        return crud.archive_completed_todos(
+            db,
+            completed_before=datetime.now() - ARCHIVE_AFTER,
+            chunk_size=PURGE_CHUNK_SIZE
+        )
+    finally:
+        db.close()
+
+async def run_purger(interval: float = PURGE_INTERVAL_SECONDS):
+    """循环清理墓碑并归档，数据库操作放到线程池中执行，不阻塞事件循环"""
+    while True:
+        try:
+            purged = await asyncio.to_thread(purge_once)
+            if purged:
+                logger.info(f"Purged {purged} deleted todos")
+        except Exception as exc:
+            logger.error(f"Tombstone purge failed: {exc}")
+        try:
+            archived = await asyncio.to_thread(archive_once)
+            if archived:
+                logger.info(f"Archived {archived} completed todos")
+        except Exception as exc:
+            logger.error(f"Archiving failed: {exc}")
+        await asyncio.sleep(interval)
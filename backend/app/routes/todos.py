@@ -1,52 +1,214 @@
-from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Response
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
 from sqlalchemy.orm import Session
-from typing import List
-from .. import crud, models, schemas
+from typing import List, Optional
+from datetime import datetime
+from .. import autocomplete, crud, models, schemas
 from ..database import get_db
 
 router = APIRouter(prefix="/api/v1/todos", tags=["todos"])
 
+def _etag(version: int) -> str:
+    return f'"{version}"'
+
+def _if_match_versions(if_match: Optional[str]) -> Optional[List[int]]:
+    """解析 If-Match 头，返回允许的版本号；未提供或为 * 时返回 None，表示不检查版本
+
+    If-Match 使用强比较，弱 ETag（W/"..."）和无法识别的值不匹配任何版本。
+    """
+    if if_match is None or if_match.strip() == "*":
+        return None
+    versions = []
+    for tag in if_match.split(","):
+        tag = tag.strip()
+        if len(tag) > 2 and tag[0] == tag[-1] == '"' and tag[1:-1].isdigit():
+            versions.append(int(tag[1:-1]))
+    return versions
+
 @router.get("/", response_model=schemas.TodoListResponse)
 def get_todos(
     status: schemas.FilterStatus = Query(default="all", description="过滤状态"),
     page: int = Query(default=1, ge=1, description="页码"),
     limit: int = Query(default=10, ge=1, le=100, description="每页数量"),
+    cursor: Optional[str] = Query(default=None, description="分页游标，取自上一页的 next_cursor"),
+    include_total: bool = Query(default=True, description="是否返回总数，关闭后跳过 COUNT 查询"),
+    archived: bool = Query(default=False, description="查询归档的已完成任务"),
+    fields: Optional[str] = Query(default=None, description="只返回这些字段，逗号分隔，如 id,title,is_completed"),
+    description: schemas.DescriptionMode = Query(
+        default="full", description="描述的返回方式：完整、截断预览或不返回"
+    ),
+    sort: Optional[schemas.SortField] = Query(
+        default=None, description="排序字段，默认 created_at（overdue 列表默认 due_date）"
+    ),
+    order: Optional[schemas.SortOrder] = Query(default=None, description="排序方向，默认 due_date 升序、其他倒序"),
+    priority_min: Optional[int] = Query(default=None, ge=1, le=5, description="最低优先级（含）"),
+    priority_max: Optional[int] = Query(default=None, ge=1, le=5, description="最高优先级（含）"),
+    due_after: Optional[datetime] = Query(default=None, description="截止日期不早于此时间"),
+    due_before: Optional[datetime] = Query(default=None, description="截止日期早于此时间"),
     db: Session = Depends(get_db)
 ):
-    """获取所有待办事项"""
+    """获取所有待办事项
+
+    指定 fields 时数据库只查询这些列，响应中的每一项也只包含这些字段。
+    description=preview 只返回描述的开头部分，description=none 不查询也不返回描述，
+    完整描述通过 GET /{todo_id} 获取。
+    排序键相同的记录按 id 排列，offset 和游标分页都保持稳定的次序。
+    """
+    field_list = None
+    if fields is not None:
+        field_list = list(dict.fromkeys(name.strip() for name in fields.split(",") if name.strip()))
+        unknown = [name for name in field_list if name not in schemas.TODO_FIELDS]
+        if not field_list or unknown:
+            raise HTTPException(status_code=400, detail=f"Invalid fields: {', '.join(unknown) or fields}")
+    if description == schemas.DescriptionMode.none:
+        field_list = [name for name in field_list or schemas.TODO_FIELDS if name != "description"]
+    
+    sort_column, descending = crud.resolve_sort(
+        status.value, sort.value if sort else None, order.value if order else None
+    )
     skip = (page - 1) * limit
-    todos, total = crud.get_todos(db, status=status.value, skip=skip, limit=limit)
+    # 多取一条用于判断是否还有下一页
+    try:
+        todos, total = crud.get_todos(
+            db, status=status.value, skip=skip, limit=limit + 1, cursor=cursor,
+            include_total=include_total, archived=archived, fields=field_list,
+            description_preview=description == schemas.DescriptionMode.preview,
+            sort=sort_column, order="desc" if descending else "asc",
+            priority_min=priority_min, priority_max=priority_max,
+            due_after=due_after, due_before=due_before
+        )
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    
+    has_more = len(todos) > limit
+    next_cursor = crud.encode_cursor(todos[limit - 1], sort_column) if has_more else None
+    todos = todos[:limit]
+    
+    if field_list is not None:
+        # 部分字段的条目不满足 TodoResponse，直接序列化所选字段
+        return JSONResponse(jsonable_encoder({
+            "success": True,
+            "message": None,
+            "data": [{name: todo._mapping[name] for name in field_list} for todo in todos],
+            "total": total,
+            "page": page,
+            "limit": limit,
+            "has_more": has_more,
+            "next_cursor": next_cursor
+        }))
     
     return schemas.TodoListResponse(
         success=True,
-        data=[schemas.TodoResponse.model_validate(todo) for todo in todos],
+        # crud 返回只读 Row，转成 dict 后由响应模型一次性校验整个列表
+        data=[todo._asdict() for todo in todos],
         total=total,
         page=page,
-        limit=limit
+        limit=limit,
+        has_more=has_more,
+        next_cursor=next_cursor
     )
 
 @router.post("/", response_model=schemas.SingleTodoResponse, status_code=201)
 def create_todo(
     todo: schemas.TodoCreate,
+    response: Response,
     db: Session = Depends(get_db)
 ):
     """创建新的待办事项"""
     db_todo = crud.create_todo(db=db, todo=todo)
+    response.headers["ETag"] = _etag(db_todo.version)
     return schemas.SingleTodoResponse(
         success=True,
         data=schemas.TodoResponse.model_validate(db_todo)
     )
 
+@router.post("/bulk", response_model=schemas.BatchResponse, status_code=201)
+def bulk_create_todos(
+    todos: List[schemas.TodoCreate],
+    db: Session = Depends(get_db)
+):
+    """批量创建待办事项，一次事务插入并返回新建的 id"""
+    todo_ids = crud.bulk_create_todos(db, todos)
+    return schemas.BatchResponse(
+        success=True,
+        message=f"Created {len(todo_ids)} todos",
+        data=schemas.BatchResult(count=len(todo_ids), todo_ids=todo_ids)
+    )
+
+@router.get("/deleted", response_model=schemas.DeletedTodoListResponse)
+def get_deleted_todos(
+    since: Optional[datetime] = Query(default=None, description="上一页最后一条墓碑的 deleted_at"),
+    since_id: Optional[int] = Query(
+        default=None, description="上一页最后一条墓碑的 id，需与 since 一起传；不传时只返回晚于 since 删除的记录"
+    ),
+    limit: int = Query(default=100, ge=1, le=1000, description="最多返回数量"),
+    db: Session = Depends(get_db)
+):
+    """获取已删除待办事项的墓碑，供同步客户端按 (deleted_at, id) 增量拉取"""
+    try:
+        deleted = crud.get_deleted_todos(db, since=since, since_id=since_id, limit=limit)
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail=str(exc))
+    return schemas.DeletedTodoListResponse(
+        success=True,
+        data=[schemas.DeletedTodo.model_validate(row) for row in deleted]
+    )
+
+@router.get("/search", response_model=schemas.TodoListResponse)
+def search_todos(
+    q: str = Query(..., min_length=1, max_length=200, description="搜索关键词，多个词之间为 AND"),
+    page: int = Query(default=1, ge=1, description="页码"),
+    limit: int = Query(default=10, ge=1, le=100, description="每页数量"),
+    include_total: bool = Query(default=True, description="是否返回匹配总数"),
+    fuzzy: bool = Query(default=False, description="按标题容错搜索，结果按三元组相似度排序"),
+    db: Session = Depends(get_db)
+):
+    """全文检索标题和描述，按相关度排序；fuzzy=true 时按标题容错搜索"""
+    skip = (page - 1) * limit
+    if fuzzy:
+        if len(q.strip()) < 2:
+            raise HTTPException(status_code=400, detail="Fuzzy search requires at least 2 characters")
+        todos, total = crud.fuzzy_search_todos(db, q, skip=skip, limit=limit + 1)
+        total = total if include_total else None
+    else:
+        # 多取一条用于判断是否还有下一页
+        todos, total = crud.search_todos(db, q, skip=skip, limit=limit + 1, include_total=include_total)
+    
+    return schemas.TodoListResponse(
+        success=True,
+        data=[todo._asdict() for todo in todos[:limit]],
+        total=total,
+        page=page,
+        limit=limit,
+        has_more=len(todos) > limit
+    )
+
+@router.get("/autocomplete", response_model=schemas.AutocompleteResponse)
+def autocomplete_titles(
+    prefix: str = Query(..., min_length=1, max_length=255, description="标题前缀，不区分大小写"),
+    limit: int = Query(default=10, ge=1, le=50, description="最多返回的建议数"),
+):
+    """按前缀补全已有的标题，直接读取进程内索引，不访问数据库"""
+    return schemas.AutocompleteResponse(
+        success=True,
+        data=autocomplete.title_index.suggest(prefix, limit)
+    )
+
 @router.get("/{todo_id}", response_model=schemas.SingleTodoResponse)
 def get_todo(
     todo_id: int,
+    response: Response,
     db: Session = Depends(get_db)
 ):
-    """获取单个待办事项"""
+    """获取单个待办事项，已归档的任务同样可以读取；版本号通过 ETag 头返回"""
     db_todo = crud.get_todo(db, todo_id=todo_id)
+    if db_todo is None:
+        db_todo = crud.get_archived_todo(db, todo_id=todo_id)
     if db_todo is None:
         raise HTTPException(status_code=404, detail="Todo not found")
     
+    response.headers["ETag"] = _etag(db_todo.version)
     return schemas.SingleTodoResponse(
         success=True,
         data=schemas.TodoResponse.model_validate(db_todo)
@@ -56,28 +218,66 @@ def get_todo(
 def update_todo(
     todo_id: int,
     todo_update: schemas.TodoUpdate,
+    response: Response,
+    if_match: Optional[str] = Header(default=None, description="上次读取到的 ETag，版本不一致时返回 412"),
     db: Session = Depends(get_db)
 ):
     """更新待办事项"""
-    db_todo = crud.update_todo(db, todo_id=todo_id, todo_update=todo_update)
+    try:
+        db_todo = crud.update_todo(
+            db, todo_id=todo_id, todo_update=todo_update, expected_versions=_if_match_versions(if_match)
+        )
+    except crud.VersionConflict:
+        raise HTTPException(status_code=412, detail="Todo has been modified")
     if db_todo is None:
         raise HTTPException(status_code=404, detail="Todo not found")
     
+    response.headers["ETag"] = _etag(db_todo.version)
     return schemas.SingleTodoResponse(
         success=True,
         data=schemas.TodoResponse.model_validate(db_todo)
     )
 
+@router.patch("/bulk", response_model=schemas.BulkUpdateResponse)
+def bulk_update_todos(
+    items: List[schemas.TodoBulkUpdateItem],
+    db: Session = Depends(get_db)
+):
+    """批量更新待办事项，所有修改在一个事务中提交，逐项返回是否成功"""
+    outcomes = crud.bulk_update_todos(db, items)
+    results = [
+        schemas.BulkUpdateItemResult(
+            id=item.id,
+            success=outcome is True,
+            error=None if outcome is True else (
+                "Version conflict" if isinstance(outcome, crud.VersionConflict) else "Todo not found"
+            )
+        )
+        for item, outcome in zip(items, outcomes)
+    ]
+    updated = sum(result.success for result in results)
+    return schemas.BulkUpdateResponse(
+        success=True,
+        message=f"Updated {updated} of {len(items)} todos",
+        data=results
+    )
+
 @router.patch("/{todo_id}/toggle", response_model=schemas.SingleTodoResponse)
 def toggle_todo(
     todo_id: int,
+    response: Response,
+    if_match: Optional[str] = Header(default=None, description="上次读取到的 ETag，版本不一致时返回 412"),
     db: Session = Depends(get_db)
 ):
     """切换待办事项完成状态"""
-    db_todo = crud.toggle_todo(db, todo_id=todo_id)
+    try:
+        db_todo = crud.toggle_todo(db, todo_id=todo_id, expected_versions=_if_match_versions(if_match))
+    except crud.VersionConflict:
+        raise HTTPException(status_code=412, detail="Todo has been modified")
     if db_todo is None:
         raise HTTPException(status_code=404, detail="Todo not found")
     
+    response.headers["ETag"] = _etag(db_todo.version)
     return schemas.SingleTodoResponse(
         success=True,
         data=schemas.TodoResponse.model_validate(db_todo)
@@ -86,10 +286,14 @@ def toggle_todo(
 @router.delete("/{todo_id}", response_model=schemas.BaseResponse)
 def delete_todo(
     todo_id: int,
+    if_match: Optional[str] = Header(default=None, description="上次读取到的 ETag，版本不一致时返回 412"),
     db: Session = Depends(get_db)
 ):
     """删除待办事项"""
-    success = crud.delete_todo(db, todo_id=todo_id)
+    try:
+        success = crud.delete_todo(db, todo_id=todo_id, expected_versions=_if_match_versions(if_match))
+    except crud.VersionConflict:
+        raise HTTPException(status_code=412, detail="Todo has been modified")
     if not success:
         raise HTTPException(status_code=404, detail="Todo not found")
     
@@ -98,27 +302,52 @@ def delete_todo(
         message="Todo deleted successfully"
     )
 
-@router.post("/batch", response_model=schemas.BaseResponse)
+@router.post("/batch", response_model=schemas.BatchResponse)
 def batch_operation(
     request: schemas.BatchRequest,
     db: Session = Depends(get_db)
 ):
-    """批量操作"""
+    """批量操作
+
+    complete / uncomplete / delete / set_priority 只作用于 todo_ids，
+    并在响应中返回实际受影响的 id。
+    """
+    todo_ids = None
     if request.action == schemas.BatchAction.delete_completed:
-        count = crud.batch_delete_completed(db)
+        count = crud.batch_delete_completed(db, chunk_size=request.chunk_size)
         message = f"Deleted {count} completed todos"
     elif request.action == schemas.BatchAction.delete_all:
-        count = crud.batch_delete_all(db)
+        count = crud.batch_delete_all(db, chunk_size=request.chunk_size)
         message = f"Deleted {count} todos"
     elif request.action == schemas.BatchAction.complete_all:
-        count = crud.batch_complete_all(db)
+        count = crud.batch_complete_all(db, chunk_size=request.chunk_size)
         message = f"Completed {count} todos"
+    elif not request.todo_ids:
+        raise HTTPException(status_code=400, detail="todo_ids is required for this action")
+    elif request.action == schemas.BatchAction.complete:
+        todo_ids = crud.batch_complete_by_ids(db, request.todo_ids)
+        message = f"Completed {len(todo_ids)} todos"
+    elif request.action == schemas.BatchAction.uncomplete:
+        todo_ids = crud.batch_uncomplete_by_ids(db, request.todo_ids)
+        message = f"Marked {len(todo_ids)} todos as pending"
+    elif request.action == schemas.BatchAction.delete:
+        todo_ids = crud.batch_delete_by_ids(db, request.todo_ids)
+        message = f"Deleted {len(todo_ids)} todos"
+    elif request.action == schemas.BatchAction.set_priority:
+        if request.priority is None:
+            raise HTTPException(status_code=400, detail="priority is required for set_priority")
+        todo_ids = crud.batch_set_priority_by_ids(db, request.todo_ids, request.priority)
+        message = f"Updated priority of {len(todo_ids)} todos"
     else:
         raise HTTPException(status_code=400, detail="Invalid action")
     
-    return schemas.BaseResponse(
+    if todo_ids is not None:
+        count = len(todo_ids)
+    
+    return schemas.BatchResponse(
         success=True,
-        message=message
+        message=message,
+        data=schemas.BatchResult(count=count, todo_ids=todo_ids)
     )
 
 @router.get("/stats/", response_model=schemas.StatsResponseWrapper)
@@ -7,11 +7,32 @@ class FilterStatus(str, Enum):
     all = "all"
     completed = "completed"
     pending = "pending"
+    overdue = "overdue"
+
+class SortField(str, Enum):
+    created_at = "created_at"
+    updated_at = "updated_at"
+    due_date = "due_date"
+    priority = "priority"
+
+class SortOrder(str, Enum):
+    asc = "asc"
+    desc = "desc"
+
+class DescriptionMode(str, Enum):
+    full = "full"
+    preview = "preview"
+    none = "none"
 
 class BatchAction(str, Enum):
     delete_completed = "delete_completed"
     delete_all = "delete_all"
     complete_all = "complete_all"
+    # 以下操作只作用于 todo_ids 指定的待办事项
+    complete = "complete"
+    uncomplete = "uncomplete"
+    delete = "delete"
+    set_priority = "set_priority"
 
 # 基础Todo模式
 class TodoBase(BaseModel):
@@ -32,6 +53,12 @@ class TodoUpdate(BaseModel):
     priority: Optional[int] = Field(None, ge=1, le=5)
     due_date: Optional[datetime] = None
 
+# 批量更新中的单项
+class TodoBulkUpdateItem(BaseModel):
+    id: int
+    changes: TodoUpdate
+    version: Optional[int] = Field(None, description="上次读取到的版本号，与当前版本不一致时该项报告冲突，不传表示不检查")
+
 # 响应模式
 class TodoResponse(TodoBase):
     id: int
@@ -39,14 +66,39 @@ class TodoResponse(TodoBase):
     created_at: datetime
     updated_at: datetime
     completed_at: Optional[datetime] = None
+    version: int = 1
 
     class Config:
         from_attributes = True
 
+# 列表接口 fields 参数可选的字段
+TODO_FIELDS = tuple(TodoResponse.model_fields)
+
 # 批量操作请求模式
 class BatchRequest(BaseModel):
     action: BatchAction
     todo_ids: Optional[list[int]] = None
+    chunk_size: Optional[int] = Field(None, ge=1, description="分片大小，设置后每次处理至多这么多行并分批提交")
+    priority: Optional[int] = Field(None, ge=1, le=5, description="set_priority 操作的目标优先级")
+
+# 批量操作结果
+class BatchResult(BaseModel):
+    count: int
+    todo_ids: Optional[list[int]] = None
+
+# 批量更新的单项结果
+class BulkUpdateItemResult(BaseModel):
+    id: int
+    success: bool
+    error: Optional[str] = None
+
+# 已删除（墓碑）记录
+class DeletedTodo(BaseModel):
+    id: int
+    deleted_at: datetime
+
+    class Config:
+        from_attributes = True
 
 # 统计信息响应模式
 class StatsResponse(BaseModel):
@@ -62,9 +114,11 @@ class BaseResponse(BaseModel):
 
 class TodoListResponse(BaseResponse):
     data: list[TodoResponse]
-    total: int
+    total: Optional[int] = None
     page: int
     limit: int
+    has_more: bool = False
+    next_cursor: Optional[str] = None
 
 class SingleTodoResponse(BaseResponse):
     data: TodoResponse
@@ -72,6 +126,18 @@ class SingleTodoResponse(BaseResponse):
 class StatsResponseWrapper(BaseResponse):
     data: StatsResponse
 
+class BatchResponse(BaseResponse):
+    data: BatchResult
+
+class BulkUpdateResponse(BaseResponse):
+    data: list[BulkUpdateItemResult]
+
+class DeletedTodoListResponse(BaseResponse):
+    data: list[DeletedTodo]
+
+class AutocompleteResponse(BaseResponse):
+    data: list[str]
+
 # 错误响应模式
 class ErrorDetail(BaseModel):
     code: str
@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+"""
+热点读取微基准：对比每次构造 ORM Query、加载 ORM 实体的旧写法
+与 crud 中预构建的 Core 语句的单次调用耗时
+
+用法: python benchmark_reads.py [次数]
+"""
+import sys
+import timeit
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from app.database import Base
+from app import crud, models, schemas
+
+def query_get_todo(db, todo_id):
+    """旧写法：每次调用都构造 ORM Query"""
+    return db.query(models.Todo).filter(
+        models.Todo.id == todo_id, models.Todo.deleted_at.is_(None)
+    ).first()
+
+def query_get_todos(db, limit):
+    """旧写法：每次调用都构造 ORM Query"""
+    query = db.query(models.Todo).filter(
+        models.Todo.deleted_at.is_(None), models.Todo.is_completed == False
+    )
+    total = query.count()
+    todos = query.order_by(
+        models.Todo.created_at.desc(), models.Todo.id.desc()
+    ).offset(0).limit(limit).all()
+    return todos, total
+
+def serialize_entities(todos):
+    return schemas.TodoListResponse(
+        success=True, page=1, limit=len(todos),
+        data=[schemas.TodoResponse.model_validate(todo) for todo in todos]
+    )
+
+def serialize_rows(todos):
+    return schemas.TodoListResponse(
+        success=True, page=1, limit=len(todos), data=[todo._asdict() for todo in todos]
+    )
+
+def main():
+    number = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(bind=engine)
+    Session = sessionmaker(bind=engine)
+    db = Session()
+    db.add_all(models.Todo(title=f"Todo {i}", priority=i % 5 + 1) for i in range(200))
+    db.commit()
+
+    cases = [
+        ("get_todo", lambda: query_get_todo(db, 100), lambda: crud.get_todo(db, 100)),
+        (
+            "get_todos(pending, limit=10)",
+            lambda: query_get_todos(db, 10),
+            lambda: crud.get_todos(db, status="pending", limit=10)
+        ),
+        (
+            "get_todos(pending, limit=100) + 序列化",
+            # 与接口一样每次使用新的会话，ORM 实体不能复用 identity map 中已加载的对象
+            lambda: serialize_entities(query_get_todos(Session(), 100)[0]),
+            lambda: serialize_rows(crud.get_todos(Session(), status="pending", limit=100)[0])
+        ),
+    ]
+
+    print(f"🚀 热点读取微基准（每项 {number} 次）")
+    print("=" * 50)
+    for name, before, after in cases:
+        # 预热，保证两边都已进入编译缓存
+        before()
+        after()
+        before_us = min(timeit.repeat(before, number=number, repeat=3)) / number * 1e6
+        after_us = min(timeit.repeat(after, number=number, repeat=3)) / number * 1e6
+        print(f"{name}:")
+        print(f"   ORM Query:  {before_us:8.1f} µs/次")
+        print(f"   Core 语句:  {after_us:8.1f} µs/次 ({before_us / after_us:.2f}x)")
+
+if __name__ == "__main__":
+    main()
@@ -1,11 +1,13 @@
 import pytest
+from contextlib import contextmanager
 from fastapi.testclient import TestClient
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event
 from sqlalchemy.orm import sessionmaker
 from datetime import datetime, timedelta
 from app.database import Base, get_db
 from app.main import app
 from app.models import Todo
+from app.autocomplete import title_index
 
 # 创建测试数据库
 SQLALCHEMY_DATABASE_URL = "sqlite:///./test.db"
@@ -35,9 +37,10 @@ def test_client():
 @pytest.fixture
 def clean_db():
     """每个测试前清理数据库"""
-    # 清理所有表
+    # 清理所有表和进程内的标题补全索引
     Base.metadata.drop_all(bind=engine)
     Base.metadata.create_all(bind=engine)
+    title_index.clear()
     yield
     # 测试后清理
     Base.metadata.drop_all(bind=engine)
@@ -48,6 +51,7 @@ def db_session():
     """Provide clean database session for each test"""
     Base.metadata.drop_all(bind=engine)
     Base.metadata.create_all(bind=engine)
+    title_index.clear()
     
     db = TestingSessionLocal()
     try:
@@ -56,6 +60,51 @@ def db_session():
         db.close()
         Base.metadata.drop_all(bind=engine)
 
+@pytest.fixture
+def sql_recorder(db_session):
+    """Record SQL statements executed inside the returned context manager"""
+    @contextmanager
+    def recorder():
+        statements = []
+        
+        def before_execute(conn, cursor, statement, *args):
+            statements.append(statement)
+        
+        engine = db_session.get_bind()
+        event.listen(engine, "before_cursor_execute", before_execute)
+        try:
+            yield statements
+        finally:
+            event.remove(engine, "before_cursor_execute", before_execute)
+    
+    return recorder
+
+@pytest.fixture
+def query_plans(db_session):
+    """Collect EXPLAIN QUERY PLAN details of the SELECTs executed inside the returned context manager"""
+    @contextmanager
+    def recorder():
+        executed = []
+        plans = []
+        
+        def before_execute(conn, cursor, statement, parameters, *args):
+            if statement.lstrip().upper().startswith("SELECT"):
+                executed.append((statement, parameters))
+        
+        engine = db_session.get_bind()
+        event.listen(engine, "before_cursor_execute", before_execute)
+        try:
+            yield plans
+        finally:
+            event.remove(engine, "before_cursor_execute", before_execute)
+        
+        connection = db_session.connection()
+        for statement, parameters in executed:
+            rows = connection.exec_driver_sql(f"EXPLAIN QUERY PLAN {statement}", parameters).fetchall()
+            plans.append(" ".join(row[-1] for row in rows))
+    
+    return recorder
+
 @pytest.fixture
 def sample_todo(db_session):
     """Provide a sample todo for testing"""
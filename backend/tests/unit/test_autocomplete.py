@@ -0,0 +1,161 @@
+"""
+Unit tests for the in-memory title prefix index
+"""
+from datetime import datetime, timedelta
+
+from app import crud, schemas
+from app.autocomplete import SCAN_LIMIT, TitleIndex, load_titles, title_index
+
+
+class TestTitleIndex:
+    """Test suite for TitleIndex"""
+
+    def test_suggest_matches_prefix_case_insensitively(self):
+        """Test that only titles starting with the prefix are returned"""
+        index = TitleIndex()
+        index.load([(1, "Buy milk"), (2, "buy bread"), (3, "Call mom")])
+        
+        assert index.suggest("BUY") == ["buy bread", "Buy milk"]
+        assert index.suggest("x") == []
+
+    def test_suggest_orders_by_usage(self):
+        """Test that frequently used titles come first and limit is honoured"""
+        index = TitleIndex()
+        index.load([(1, "Stand-up"), (2, "Stretch"), (3, "Stand-up"), (4, "Study")])
+        
+        assert index.suggest("st", limit=2) == ["Stand-up", "Stretch"]
+
+    def test_titles_leave_when_last_todo_goes(self):
+        """Test that discard and rename drop titles no todo uses anymore"""
+        index = TitleIndex()
+        index.load([(1, "Gym"), (2, "Gym"), (3, "Garden")])
+        
+        index.discard(1)
+        assert index.suggest("g") == ["Gym", "Garden"]
+        index.discard(2)
+        index.rename(3, "Groceries")
+        assert index.suggest("g") == ["Groceries"]
+        index.discard(99)
+        assert len(index) == 1
+
+    def test_eviction_keeps_frequent_titles(self):
+        """Test that exceeding the cap evicts the least used titles"""
+        index = TitleIndex(max_titles=10)
+        for todo_id in range(3):
+            index.add(todo_id, "Daily review")
+        for todo_id in range(3, 20):
+            index.add(todo_id, f"Once {todo_id}")
+        
+        assert len(index) <= 10
+        assert index.suggest("daily") == ["Daily review"]
+        # Ids of evicted titles are forgotten as well
+        index.discard(3)
+        assert len(index) <= 10
+
+    def test_suggest_reads_a_bounded_number_of_titles(self):
+        """Test that a lookup examines at most SCAN_LIMIT titles however many match"""
+        class CountingList(list):
+            examined = 0
+            def __getitem__(self, item):
+                result = super().__getitem__(item)
+                CountingList.examined += len(result) if isinstance(item, slice) else 1
+                return result
+        
+        index = TitleIndex()
+        index.load((i, f"Task {i:05d}") for i in range(10000))
+        index._keys = CountingList(index._keys)
+        
+        for prefix, expected in [("t", "Task 00000"), ("task 012", "Task 01200"), ("task 01234", "Task 01234")]:
+            CountingList.examined = 0
+            assert index.suggest(prefix, limit=1) == [expected]
+            # bisect probes plus at most one scanned range
+            assert CountingList.examined <= SCAN_LIMIT + 64
+
+    def test_new_titles_survive_a_full_index(self):
+        """Test that a title added to an index full of frequent titles stays suggestible"""
+        index = TitleIndex(max_titles=10)
+        for todo_id in range(30):
+            index.add(todo_id, f"Old {todo_id % 10}")
+        
+        index.add(100, "New")
+        assert index.suggest("new") == ["New"]
+        # Counts age on eviction, so a few fresh uses outrank stale ones
+        for todo_id in range(101, 120):
+            index.add(todo_id, f"Fresh {todo_id}")
+        index.add(200, "Fresh 101")
+        assert "Fresh 101" in index.suggest("fresh")
+
+    def test_rename_updates_capitalization(self):
+        """Test that a case-only rename changes the suggested spelling"""
+        index = TitleIndex()
+        index.load([(1, "buy milk")])
+        
+        index.rename(1, "Buy Milk")
+        assert index.suggest("buy") == ["Buy Milk"]
+
+    def test_suggest_ranks_every_prefix_match(self):
+        """Test that a frequent title sorting after many matches is still suggested"""
+        index = TitleIndex()
+        index.load((i, f"Task {i:04d}") for i in range(1000))
+        for todo_id in range(1000, 1003):
+            index.add(todo_id, "Tidy desk")
+        
+        assert index.suggest("t", limit=1) == ["Tidy desk"]
+
+
+class TestIndexMaintenance:
+    """Test suite for keeping the global index in step with crud writes"""
+
+    def test_crud_writes_update_index(self, db_session):
+        """Test that create, update and delete are reflected immediately"""
+        todo = crud.create_todo(db_session, schemas.TodoCreate(title="Write report"))
+        crud.bulk_create_todos(db_session, [schemas.TodoCreate(title="Water plants")])
+        assert title_index.suggest("w") == ["Water plants", "Write report"]
+        
+        crud.update_todo(db_session, todo.id, schemas.TodoUpdate(title="Review report"))
+        assert title_index.suggest("w") == ["Water plants"]
+        assert title_index.suggest("rev") == ["Review report"]
+        
+        crud.delete_todo(db_session, todo.id)
+        assert title_index.suggest("rev") == []
+
+    def test_load_titles_skips_deleted(self, db_session):
+        """Test that the startup load reads only live todos"""
+        kept = crud.create_todo(db_session, schemas.TodoCreate(title="Keep me"))
+        gone = crud.create_todo(db_session, schemas.TodoCreate(title="Kill me"))
+        crud.delete_todo(db_session, gone.id)
+        title_index.clear()
+        
+        load_titles(db_session)
+        
+        assert title_index.suggest("k") == [kept.title]
+
+    def test_bulk_and_batch_writes_update_index(self, db_session):
+        """Test that bulk renames and batch deletes are reflected immediately"""
+        ids = crud.bulk_create_todos(db_session, [
+            schemas.TodoCreate(title=f"Groceries {i}") for i in range(4)
+        ])
+        
+        crud.bulk_update_todos(db_session, [
+            schemas.TodoBulkUpdateItem(id=ids[0], changes=schemas.TodoUpdate(title="Rent")),
+            schemas.TodoBulkUpdateItem(id=ids[1], changes=schemas.TodoUpdate(is_completed=True)),
+        ])
+        assert title_index.suggest("ren") == ["Rent"]
+        
+        crud.batch_delete_completed(db_session)
+        crud.batch_delete_by_ids(db_session, [ids[2]])
+        assert title_index.suggest("gro") == ["Groceries 3"]
+        
+        crud.batch_delete_all(db_session, chunk_size=1)
+        assert title_index.suggest("") == []
+
+    def test_archived_todos_leave_and_return(self, db_session):
+        """Test that archiving drops a title and writing to the archived todo restores it"""
+        todo_id = crud.create_todo(db_session, schemas.TodoCreate(title="File taxes")).id
+        crud.create_todo(db_session, schemas.TodoCreate(title="Newest"))
+        crud.toggle_todo(db_session, todo_id)
+        crud.archive_completed_todos(db_session, datetime.now() + timedelta(seconds=1))
+        assert title_index.suggest("file") == []
+        
+        crud.toggle_todo(db_session, todo_id)
+        assert title_index.suggest("file") == ["File taxes"]
@@ -10,6 +10,11 @@ from sqlalchemy.orm import Session
 from app import crud, models, schemas
 
 
+def live_todos(db_session):
+    """Query todos that are not soft-deleted"""
+    return db_session.query(models.Todo).filter(models.Todo.deleted_at.is_(None))
+
+
 class TestGetTodo:
     """Test suite for get_todo function"""
 
@@ -57,7 +62,7 @@ class TestGetTodo:
         # Test that session is not closed by function
         assert db_session.is_active
 
-    def test_get_todo_query_efficiency(self, db_session):
+    def test_get_todo_query_efficiency(self, db_session, sql_recorder):
         """Test that function performs efficient database query"""
         # Create multiple todos
         for i in range(5):
@@ -65,14 +70,32 @@ class TestGetTodo:
             db_session.add(todo)
         db_session.commit()
         
-        # Mock the query to count calls
-        with patch.object(db_session, 'query') as mock_query:
-            mock_query.return_value.filter.return_value.first.return_value = None
-            
+        with sql_recorder() as statements:
             crud.get_todo(db_session, 1)
-            
-            # Should only call query once
-            assert mock_query.call_count == 1
+        
+        # Should only run one query
+        assert len(statements) == 1
+
+    def test_get_todo_reuses_compiled_statement(self, db_session, sample_todo):
+        """Test that repeated reads hit SQLAlchemy's compiled statement cache"""
+        from sqlalchemy import event
+        
+        cache_hits = []
+        engine = db_session.get_bind()
+        
+        def before_execute(conn, cursor, statement, parameters, context, executemany):
+            cache_hits.append(context.cache_hit == context.dialect.CACHE_HIT)
+        
+        crud.get_todo(db_session, sample_todo.id)
+        crud.get_todos(db_session, limit=5)
+        event.listen(engine, "before_cursor_execute", before_execute)
+        try:
+            crud.get_todo(db_session, sample_todo.id + 1)
+            crud.get_todos(db_session, limit=7)
+        finally:
+            event.remove(engine, "before_cursor_execute", before_execute)
+        
+        assert cache_hits == [True, True, True]
 
 
 class TestGetTodos:
@@ -183,6 +206,336 @@ class TestGetTodos:
         assert len(todos) > 0
         assert total == len(multiple_todos)
 
+    def test_get_todos_cursor_pages_through_all(self, db_session, many_todos):
+        """Test keyset pagination returns every todo exactly once"""
+        seen = []
+        todos, total = crud.get_todos(db_session, limit=6)
+        while todos:
+            seen.extend(todo.id for todo in todos)
+            cursor = crud.encode_cursor(todos[-1])
+            todos, _ = crud.get_todos(db_session, limit=6, cursor=cursor)
+        
+        assert total == len(many_todos)
+        assert sorted(seen) == sorted(todo.id for todo in many_todos)
+        assert len(seen) == len(set(seen))
+
+    def test_get_todos_cursor_matches_offset_order(self, db_session, many_todos):
+        """Test cursor page equals the next offset page"""
+        first_page, _ = crud.get_todos(db_session, limit=5)
+        offset_page, _ = crud.get_todos(db_session, skip=5, limit=5)
+        cursor_page, _ = crud.get_todos(
+            db_session, limit=5, cursor=crud.encode_cursor(first_page[-1])
+        )
+        
+        assert [t.id for t in cursor_page] == [t.id for t in offset_page]
+
+    def test_get_todos_cursor_with_microsecond_timestamps(self, db_session):
+        """Test cursor handles explicitly set timestamps with microseconds"""
+        now = datetime.now().replace(microsecond=123456)
+        for i in range(4):
+            db_session.add(models.Todo(title=f"Same Time {i}", created_at=now))
+        db_session.commit()
+        
+        first_page, _ = crud.get_todos(db_session, limit=2)
+        second_page, _ = crud.get_todos(
+            db_session, limit=2, cursor=crud.encode_cursor(first_page[-1])
+        )
+        
+        ids = [t.id for t in first_page + second_page]
+        assert len(set(ids)) == 4
+
+    def test_get_todos_cursor_seeks_index(self, db_session, many_todos, query_plans):
+        """Test that a cursor page starts with an index range search at the cursor instead of a scan"""
+        first_page, _ = crud.get_todos(db_session, limit=5)
+        
+        with query_plans() as plans:
+            crud.get_todos(
+                db_session, limit=5, include_total=False, cursor=crud.encode_cursor(first_page[-1])
+            )
+        
+        assert len(plans) == 1
+        assert "SEARCH todos USING INDEX ix_todos_created_at_id (created_at<?)" in plans[0]
+        assert "TEMP B-TREE" not in plans[0]
+
+    def test_get_todos_without_total(self, db_session, many_todos):
+        """Test that include_total=False skips the count"""
+        todos, total = crud.get_todos(db_session, limit=5, include_total=False)
+        
+        assert total is None
+        assert len(todos) == 5
+
+    def test_get_todos_returns_untracked_rows(self, db_session, many_todos):
+        """Test that list and single reads bypass the ORM identity map"""
+        db_session.expunge_all()
+        
+        todos, _ = crud.get_todos(db_session, limit=100)
+        todo = crud.get_todo(db_session, todos[0].id)
+        
+        assert len(todos) == len(many_todos)
+        assert todo.title == todos[0].title
+        assert len(db_session.identity_map) == 0
+        assert schemas.TodoResponse.model_validate(todo).id == todos[0].id
+
+    def test_get_todos_fields_limits_projection(self, db_session, many_todos, sql_recorder):
+        """Test that fields only selects the requested columns plus the cursor keys"""
+        with sql_recorder() as statements:
+            todos, _ = crud.get_todos(db_session, limit=5, fields=["title", "is_completed"], include_total=False)
+        
+        select_list = statements[0].split("FROM")[0]
+        assert "description" not in select_list
+        assert set(todos[0]._fields) == {"title", "is_completed", "created_at", "id"}
+        assert crud.encode_cursor(todos[-1])
+
+    def test_get_todos_description_preview(self, db_session):
+        """Test that description_preview truncates the description in SQL"""
+        long_text = "描述" * crud.DESCRIPTION_PREVIEW_LENGTH
+        db_session.add(models.Todo(title="Long", description=long_text))
+        db_session.commit()
+        
+        todos, _ = crud.get_todos(db_session, description_preview=True)
+        full = crud.get_todo(db_session, todos[0].id)
+        
+        assert todos[0].description == long_text[:crud.DESCRIPTION_PREVIEW_LENGTH]
+        assert full.description == long_text
+
+    @pytest.mark.parametrize("sort", crud.SORT_COLUMNS)
+    @pytest.mark.parametrize("order", ["asc", "desc"])
+    def test_get_todos_sort_cursor_matches_offset(self, db_session, sort, order):
+        """Test that every sort order pages identically with offsets and cursors"""
+        now = datetime.now().replace(microsecond=0)
+        for i in range(12):
+            db_session.add(models.Todo(
+                title=f"Todo {i}",
+                priority=i % 3 + 1,
+                due_date=None if i % 4 == 0 else now + timedelta(days=i % 5),
+                updated_at=now - timedelta(minutes=i % 2)
+            ))
+        db_session.commit()
+        
+        by_offset, _ = crud.get_todos(db_session, limit=100, sort=sort, order=order)
+        by_cursor, cursor = [], None
+        while True:
+            page, _ = crud.get_todos(db_session, limit=5, sort=sort, order=order, cursor=cursor)
+            if not page:
+                break
+            by_cursor.extend(page)
+            cursor = crud.encode_cursor(page[-1], sort)
+        
+        def key(todo):
+            value = getattr(todo, sort)
+            # SQLite puts NULL first in ascending order and last in descending order
+            return (value is not None, value or 0, todo.id)
+        
+        expected = sorted(by_offset, key=key, reverse=order == "desc")
+        assert [t.id for t in by_offset] == [t.id for t in expected]
+        assert [t.id for t in by_cursor] == [t.id for t in by_offset]
+
+    def test_get_todos_cursor_from_other_sort_rejected(self, db_session, many_todos):
+        """Test that a cursor cannot be replayed against a different sort"""
+        todos, _ = crud.get_todos(db_session, limit=2)
+        
+        with pytest.raises(ValueError):
+            crud.get_todos(db_session, sort="priority", cursor=crud.encode_cursor(todos[-1]))
+
+    @pytest.mark.parametrize("sort", crud.SORT_COLUMNS)
+    @pytest.mark.parametrize("status,archived", [
+        ("all", False), ("completed", False), ("pending", False), ("all", True), ("completed", True),
+    ])
+    def test_get_todos_sort_uses_index(self, db_session, query_plans, sort, status, archived):
+        """Test that each supported order is read straight from an index"""
+        with query_plans() as plans:
+            crud.get_todos(
+                db_session, status=status, sort=sort, order="asc", include_total=False, archived=archived
+            )
+        
+        assert "USING INDEX" in plans[0]
+        assert "TEMP B-TREE" not in plans[0]
+
+    @pytest.mark.parametrize("sort", crud.SORT_COLUMNS)
+    @pytest.mark.parametrize("order", ["asc", "desc"])
+    @pytest.mark.parametrize("status,archived", [
+        ("all", False), ("completed", False), ("pending", False), ("all", True), ("completed", True),
+    ])
+    def test_get_todos_sort_cursor_seeks_index(self, db_session, query_plans, sort, order, status, archived):
+        """Test that cursor pages of every order are range searches starting at the cursor"""
+        import re
+        
+        model, table = (models.TodoArchive, "todos_archive") if archived else (models.Todo, "todos")
+        now = datetime.now().replace(microsecond=0)
+        for i in range(40):
+            db_session.add(model(
+                title=f"Todo {i}",
+                priority=i % 5 + 1,
+                is_completed=archived or i % 2 == 0,
+                due_date=None if i % 4 < 2 else now + timedelta(days=i % 7),
+                updated_at=now - timedelta(minutes=i % 3)
+            ))
+        db_session.commit()
+        rows, _ = crud.get_todos(
+            db_session, status=status, sort=sort, order=order, limit=100, archived=archived
+        )
+        # One cursor on a NULL sort key (due_date only) and one on a value
+        cursor_rows = [row for row in rows if getattr(row, sort) is None][:1]
+        cursor_rows += [row for row in rows if getattr(row, sort) is not None][1:2]
+        
+        with query_plans() as plans:
+            for row in cursor_rows:
+                crud.get_todos(
+                    db_session, status=status, sort=sort, order=order, limit=100, archived=archived,
+                    include_total=False, cursor=crud.encode_cursor(row, sort)
+                )
+        
+        # Completed lists look up whether the cursor row was archived (a primary key probe)
+        # and, once the hot table runs out, read the archive from its start in index order
+        plans = [detail for detail in plans if "PRIMARY KEY (rowid=?)" not in detail]
+        seek = re.compile(rf"^SEARCH {table} USING INDEX ix_{table}_(completed_)?{sort}_id \((is_completed=\? AND )?{sort}[<>=]")
+        spill = re.compile(rf"^SCAN todos_archive USING INDEX ix_todos_archive_{sort}_id")
+        assert plans
+        for detail in plans:
+            assert seek.match(detail) or (status == "completed" and spill.match(detail)), detail
+            assert "TEMP B-TREE" not in detail
+
+    def test_get_todos_range_filters(self, db_session):
+        """Test priority and due date range filters"""
+        now = datetime.now()
+        for i in range(10):
+            db_session.add(models.Todo(title=f"Todo {i}", priority=i % 5 + 1, due_date=now + timedelta(days=i)))
+        db_session.commit()
+        
+        todos, total = crud.get_todos(
+            db_session, limit=100, priority_min=4,
+            due_after=now, due_before=now + timedelta(days=7)
+        )
+        
+        assert total == len(todos) == 2
+        assert all(t.priority >= 4 and now <= t.due_date < now + timedelta(days=7) for t in todos)
+        assert crud.get_todos(db_session, priority_min=2, priority_max=3)[1] == 4
+
+    @pytest.mark.parametrize("status,archived", [
+        ("all", False), ("pending", False), ("completed", False), ("overdue", False),
+        ("all", True), ("completed", True),
+    ])
+    @pytest.mark.parametrize("ranges", [
+        {"priority_min": 2, "priority_max": 4},
+        {"priority_min": 4},
+        {"priority_max": 2},
+        {"due_after": datetime(2025, 1, 6), "due_before": datetime(2025, 1, 13)},
+        {"due_after": datetime(2025, 1, 6)},
+        {"due_before": datetime(2025, 1, 13)},
+        {"priority_min": 4, "due_after": datetime(2025, 1, 6), "due_before": datetime(2025, 1, 13)},
+        {"priority_max": 2, "due_before": datetime(2025, 1, 13)},
+    ])
+    @pytest.mark.parametrize("sort,order", [
+        (None, None), ("created_at", "asc"), ("updated_at", None),
+        ("priority", None), ("priority", "asc"), ("due_date", None), ("due_date", "desc"),
+    ])
+    def test_get_todos_range_filters_use_index(
+        self, db_session, query_plans, status, archived, ranges, sort, order
+    ):
+        """Test that range filters are index range searches for any sort, never full scans"""
+        import re
+        
+        model = models.TodoArchive if archived else models.Todo
+        now = datetime(2025, 1, 1)
+        for i in range(30):
+            db_session.add(model(
+                title=f"Todo {i}", priority=i % 5 + 1, is_completed=archived or i % 3 == 0,
+                due_date=None if i % 4 == 0 else now + timedelta(days=i)
+            ))
+        db_session.commit()
+        options = dict(status=status, sort=sort, order=order, limit=3, archived=archived, **ranges)
+        page, _ = crud.get_todos(db_session, **options)
+        sort_column, _ = crud.resolve_sort(status, sort, order)
+        
+        with query_plans() as plans:
+            crud.get_todos(db_session, **options)
+            if page:
+                crud.get_todos(
+                    db_session, include_total=False, cursor=crud.encode_cursor(page[-1], sort_column), **options
+                )
+        
+        plans = [detail for detail in plans if "PRIMARY KEY (rowid=?)" not in detail]
+        filtered = {crud.RANGE_FILTERS[name][0] for name in ranges} | ({"due_date"} if status == "overdue" else set())
+        # A due_date cursor page may read the NULL segment as well
+        assert len(plans) >= (3 if page else 2)
+        for detail in plans:
+            assert re.match(r"SEARCH todos(_archive)? USING (COVERING )?INDEX", detail), detail
+            assert "SCAN todos" not in detail
+            if sort_column in filtered:
+                assert "TEMP B-TREE" not in detail
+
+    def test_get_todos_range_filters_keep_requested_sort(self, db_session):
+        """Test that range filters do not change the default or requested order"""
+        now = datetime(2025, 1, 1)
+        db_session.add_all([
+            models.Todo(title=f"Todo {i}", priority=i % 5 + 1, created_at=now + timedelta(hours=i))
+            for i in range(10)
+        ])
+        db_session.commit()
+        
+        todos, total = crud.get_todos(db_session, priority_min=4)
+        assert total == 4
+        assert [t.title for t in todos] == ["Todo 9", "Todo 8", "Todo 4", "Todo 3"]
+        
+        first, _ = crud.get_todos(db_session, sort="created_at", order="asc", priority_min=4, limit=2)
+        rest, _ = crud.get_todos(
+            db_session, sort="created_at", order="asc", priority_min=4, limit=2,
+            cursor=crud.encode_cursor(first[-1], "created_at")
+        )
+        assert [t.title for t in first + rest] == ["Todo 3", "Todo 4", "Todo 8", "Todo 9"]
+
+    def test_get_todos_invalid_cursor(self, db_session):
+        """Test malformed cursor raises ValueError"""
+        with pytest.raises(ValueError):
+            crud.get_todos(db_session, cursor="not-a-cursor")
+
+    def _add_overdue_mix(self, db_session):
+        now = datetime.now()
+        overdue = [
+            models.Todo(title=f"Late {i}", due_date=now - timedelta(days=i + 1)) for i in range(5)
+        ]
+        db_session.add_all(overdue + [
+            models.Todo(title="Future", due_date=now + timedelta(days=1)),
+            models.Todo(title="No due date"),
+            models.Todo(title="Done", is_completed=True, due_date=now - timedelta(days=1)),
+        ])
+        db_session.commit()
+        return overdue
+
+    def test_get_todos_overdue(self, db_session):
+        """Test that overdue lists pending past-due todos, earliest due date first"""
+        overdue = self._add_overdue_mix(db_session)
+        
+        todos, total = crud.get_todos(db_session, status="overdue", limit=100)
+        
+        assert total == len(overdue)
+        assert [t.id for t in todos] == [t.id for t in reversed(overdue)]
+        assert total == crud.get_todos_stats(db_session)["overdue"]
+
+    def test_get_todos_overdue_cursor(self, db_session):
+        """Test keyset pagination over the due date ordering"""
+        overdue = self._add_overdue_mix(db_session)
+        
+        first_page, _ = crud.get_todos(db_session, status="overdue", limit=2)
+        second_page, _ = crud.get_todos(
+            db_session, status="overdue", limit=10,
+            cursor=crud.encode_cursor(first_page[-1], "due_date")
+        )
+        
+        assert [t.id for t in first_page + second_page] == [t.id for t in reversed(overdue)]
+
+    def test_get_todos_overdue_uses_due_date_index(self, db_session, query_plans):
+        """Test that the overdue count and listing are range scans on the due date index"""
+        self._add_overdue_mix(db_session)
+        
+        with query_plans() as plans:
+            crud.get_todos(db_session, status="overdue", limit=10)
+        
+        assert len(plans) == 2
+        for detail in plans:
+            assert "SEARCH todos USING INDEX ix_todos_completed_due_date_id (is_completed=? AND due_date>? AND due_date<?)" in detail
+            assert "TEMP B-TREE" not in detail
+
 
 class TestCreateTodo:
     """Test suite for create_todo function"""
@@ -277,13 +630,25 @@ class TestCreateTodo:
             crud.create_todo(db_session, todo_data)
             mock_commit.assert_called_once()
 
-    def test_create_todo_session_refresh_called(self, db_session):
-        """Test that database session refresh is called"""
+    def test_create_todo_session_refresh_not_needed(self, db_session):
+        """Test that INSERT ... RETURNING makes a refresh unnecessary"""
         todo_data = schemas.TodoCreate(title="Refresh Test")
         
         with patch.object(db_session, 'refresh') as mock_refresh:
             result = crud.create_todo(db_session, todo_data)
-            mock_refresh.assert_called_once_with(result)
+            mock_refresh.assert_not_called()
+        
+        assert result.id is not None
+        assert result.created_at is not None
+
+    def test_create_todo_single_statement(self, db_session, sql_recorder):
+        """Test that create runs as one INSERT ... RETURNING statement"""
+        with sql_recorder() as statements:
+            crud.create_todo(db_session, schemas.TodoCreate(title="One Statement"))
+        
+        assert len(statements) == 1
+        assert statements[0].startswith("INSERT INTO todos")
+        assert "RETURNING" in statements[0]
 
 
 class TestUpdateTodo:
@@ -404,6 +769,18 @@ class TestUpdateTodo:
         assert db_todo.title == "Persisted Update"
 
 
+    def test_update_todo_single_statement(self, db_session, sample_todo, sql_recorder):
+        """Test that update runs as one UPDATE ... RETURNING statement"""
+        with sql_recorder() as statements:
+            result = crud.update_todo(
+                db_session, sample_todo.id, schemas.TodoUpdate(title="One Statement")
+            )
+        
+        assert result.title == "One Statement"
+        assert len(statements) == 1
+        assert statements[0].startswith("UPDATE todos")
+        assert "RETURNING" in statements[0]
+
 class TestToggleTodo:
     """Test suite for toggle_todo function"""
 
@@ -476,6 +853,31 @@ class TestToggleTodo:
         assert result.updated_at > original_updated_at
 
 
+    def test_toggle_todo_single_statement(self, db_session, pending_todo, sql_recorder):
+        """Test that toggle runs as one UPDATE ... RETURNING statement"""
+        with sql_recorder() as statements:
+            crud.toggle_todo(db_session, pending_todo.id)
+        
+        assert len(statements) == 1
+        assert statements[0].startswith("UPDATE todos")
+        assert "RETURNING" in statements[0]
+
+    def test_toggle_todo_no_lost_update(self, db_session, pending_todo):
+        """Test that toggles from a session holding stale state are not lost"""
+        from tests.conftest import TestingSessionLocal
+        
+        other_session = TestingSessionLocal()
+        try:
+            crud.toggle_todo(other_session, pending_todo.id)
+        finally:
+            other_session.close()
+        
+        # db_session still holds pending_todo as not completed
+        result = crud.toggle_todo(db_session, pending_todo.id)
+        
+        assert result.is_completed is False
+        assert result.completed_at is None
+
 class TestDeleteTodo:
     """Test suite for delete_todo function"""
 
@@ -488,7 +890,7 @@ class TestDeleteTodo:
         assert result is True
         
         # Verify todo is deleted from database
-        deleted_todo = db_session.query(models.Todo).filter(models.Todo.id == todo_id).first()
+        deleted_todo = live_todos(db_session).filter(models.Todo.id == todo_id).first()
         assert deleted_todo is None
 
     def test_delete_nonexistent_todo(self, db_session):
@@ -548,7 +950,7 @@ class TestBatchDeleteCompleted:
         assert result == completed_count
         
         # Verify only pending todos remain
-        remaining_todos = db_session.query(models.Todo).all()
+        remaining_todos = live_todos(db_session).all()
         assert len(remaining_todos) == pending_count
         assert all(not todo.is_completed for todo in remaining_todos)
 
@@ -567,7 +969,7 @@ class TestBatchDeleteCompleted:
         assert result == 0
         
         # Verify all todos still exist
-        remaining_todos = db_session.query(models.Todo).all()
+        remaining_todos = live_todos(db_session).all()
         assert len(remaining_todos) == len(pending_todos)
 
     def test_batch_delete_empty_database(self, db_session):
@@ -585,7 +987,7 @@ class TestBatchDeleteCompleted:
         assert result == expected_count
         
         # Verify database is empty
-        remaining_todos = db_session.query(models.Todo).all()
+        remaining_todos = live_todos(db_session).all()
         assert len(remaining_todos) == 0
 
     def test_batch_delete_transaction_handling(self, db_session, mixed_status_todos):
@@ -610,3 +1012,762 @@ class TestBatchDeleteCompleted:
         """Test that function returns integer"""
         result = crud.batch_delete_completed(db_session)
         assert isinstance(result, int)
+
+
+class TestGetTodosStats:
+    """Test suite for get_todos_stats function"""
+
+    def test_stats_empty_database(self, db_session):
+        """Test statistics of an empty database"""
+        stats = crud.get_todos_stats(db_session)
+        
+        assert stats == {"total": 0, "completed": 0, "pending": 0, "overdue": 0}
+
+    def test_stats_counts(self, db_session, mixed_status_todos):
+        """Test total, completed, pending and overdue counts"""
+        db_session.add(models.Todo(
+            title="Overdue Todo",
+            due_date=datetime.now() - timedelta(days=1)
+        ))
+        db_session.add(models.Todo(
+            title="Completed Past Due",
+            is_completed=True,
+            due_date=datetime.now() - timedelta(days=1)
+        ))
+        db_session.commit()
+        
+        stats = crud.get_todos_stats(db_session)
+        
+        assert stats["total"] == 8
+        assert stats["completed"] == 4
+        assert stats["pending"] == 4
+        assert stats["overdue"] == 1
+
+    def test_stats_follow_writes(self, db_session, mixed_status_todos):
+        """Test that counters stay correct across crud write operations"""
+        crud.create_todo(db_session, schemas.TodoCreate(title="Counter Todo"))
+        crud.toggle_todo(db_session, mixed_status_todos[3].id)
+        crud.delete_todo(db_session, mixed_status_todos[0].id)
+        crud.update_todo(
+            db_session, mixed_status_todos[1].id, schemas.TodoUpdate(is_completed=False)
+        )
+        
+        stats = crud.get_todos_stats(db_session)
+        assert stats["total"] == 6
+        assert stats["completed"] == 2
+        
+        crud.batch_complete_all(db_session)
+        assert crud.get_todos_stats(db_session)["completed"] == 6
+        
+        crud.batch_delete_completed(db_session)
+        assert crud.get_todos_stats(db_session)["total"] == 0
+
+    def test_stats_overdue_uses_due_date_index(self, db_session, query_plans):
+        """Test that the overdue count is an index range search"""
+        with query_plans() as plans:
+            crud.get_todos_stats(db_session)
+        
+        assert any("SEARCH todos USING INDEX ix_todos_completed_due_date_id" in detail for detail in plans)
+
+
+class TestBatchRowcount:
+    """Test suite for batch operations reporting the affected row count"""
+
+    def test_batch_delete_completed_single_statement(self, db_session, mixed_status_todos, sql_recorder):
+        """Test that delete_completed does not run a separate count"""
+        with sql_recorder() as statements:
+            result = crud.batch_delete_completed(db_session)
+        
+        assert result == 3
+        assert not any("count(" in statement.lower() for statement in statements)
+
+    def test_batch_delete_all_count(self, db_session, mixed_status_todos, sql_recorder):
+        """Test that delete_all reports the deleted rows"""
+        with sql_recorder() as statements:
+            result = crud.batch_delete_all(db_session)
+        
+        assert result == len(mixed_status_todos)
+        assert not any("count(" in statement.lower() for statement in statements)
+
+    def test_batch_complete_all_count(self, db_session, mixed_status_todos, sql_recorder):
+        """Test that complete_all reports only the rows it changed"""
+        with sql_recorder() as statements:
+            result = crud.batch_complete_all(db_session)
+        
+        assert result == 3
+        assert not any("count(" in statement.lower() for statement in statements)
+        assert crud.batch_complete_all(db_session) == 0
+
+
+class TestChunkedBatch:
+    """Test suite for chunked batch execution"""
+
+    def test_chunked_delete_completed(self, db_session, many_todos):
+        """Test chunked delete removes every completed todo"""
+        expected = len([t for t in many_todos if t.is_completed])
+        
+        result = crud.batch_delete_completed(db_session, chunk_size=3)
+        
+        assert result == expected
+        assert live_todos(db_session).filter(models.Todo.is_completed == True).count() == 0
+        assert live_todos(db_session).count() == len(many_todos) - expected
+
+    def test_chunked_complete_all(self, db_session, many_todos):
+        """Test chunked complete reports the cumulative count"""
+        expected = len([t for t in many_todos if not t.is_completed])
+        
+        result = crud.batch_complete_all(db_session, chunk_size=4)
+        
+        assert result == expected
+        assert db_session.query(models.Todo).filter(models.Todo.is_completed == False).count() == 0
+
+    def test_chunked_delete_all(self, db_session, many_todos):
+        """Test chunked delete_all empties the table"""
+        result = crud.batch_delete_all(db_session, chunk_size=7)
+        
+        assert result == len(many_todos)
+        assert live_todos(db_session).count() == 0
+
+    def test_chunked_commits_per_slice(self, db_session, many_todos):
+        """Test that each id slice is committed separately"""
+        with patch.object(db_session, 'commit', wraps=db_session.commit) as mock_commit:
+            crud.batch_delete_all(db_session, chunk_size=5)
+        
+        assert mock_commit.call_count == 4
+
+    def test_chunked_slices_follow_matching_rows(self, db_session, sql_recorder):
+        """Test that sparse ids cost one slice per chunk of matching rows, not per id range"""
+        for todo_id in (1, 5000, 1000000, 10000000):
+            db_session.add(models.Todo(id=todo_id, title=f"Sparse {todo_id}", is_completed=True))
+        db_session.commit()
+        
+        with sql_recorder() as statements:
+            with patch.object(crud.time, "sleep") as mock_sleep:
+                result = crud.batch_delete_completed(db_session, chunk_size=1)
+        
+        assert result == 4
+        assert len([s for s in statements if s.lstrip().upper().startswith("UPDATE")]) == 4
+        # Pause between slices so waiting writers can take the lock
+        assert mock_sleep.call_count == 3
+
+    def test_chunked_empty_database(self, db_session):
+        """Test chunked mode with nothing to process"""
+        assert crud.batch_delete_completed(db_session, chunk_size=10) == 0
+
+
+class TestBatchByIds:
+    """Test suite for id-targeted batch operations"""
+
+    def test_complete_by_ids(self, db_session, pending_todos):
+        """Test completing selected todos"""
+        target = [pending_todos[0].id, pending_todos[2].id]
+        
+        result = crud.batch_complete_by_ids(db_session, target)
+        
+        assert sorted(result) == sorted(target)
+        completed = db_session.query(models.Todo).filter(models.Todo.is_completed == True).all()
+        assert sorted(t.id for t in completed) == sorted(target)
+        assert all(t.completed_at is not None for t in completed)
+
+    def test_complete_by_ids_skips_already_completed(self, db_session, mixed_status_todos):
+        """Test that only todos actually changed are reported"""
+        ids = [t.id for t in mixed_status_todos]
+        pending_ids = [t.id for t in mixed_status_todos if not t.is_completed]
+        
+        result = crud.batch_complete_by_ids(db_session, ids)
+        
+        assert sorted(result) == sorted(pending_ids)
+
+    def test_uncomplete_by_ids(self, db_session, completed_todos):
+        """Test marking selected todos as pending"""
+        result = crud.batch_uncomplete_by_ids(db_session, [completed_todos[1].id])
+        
+        assert result == [completed_todos[1].id]
+        todo = crud.get_todo(db_session, completed_todos[1].id)
+        assert todo.is_completed is False
+        assert todo.completed_at is None
+
+    def test_delete_by_ids_ignores_missing(self, db_session, multiple_todos):
+        """Test deleting selected todos with unknown ids mixed in"""
+        result = crud.batch_delete_by_ids(db_session, [multiple_todos[0].id, 99999])
+        
+        assert result == [multiple_todos[0].id]
+        assert live_todos(db_session).count() == len(multiple_todos) - 1
+
+    def test_set_priority_by_ids(self, db_session, multiple_todos):
+        """Test setting priority of selected todos"""
+        target = [t.id for t in multiple_todos[:3]]
+        
+        result = crud.batch_set_priority_by_ids(db_session, target, 5)
+        
+        assert sorted(result) == sorted(target)
+        for todo_id in target:
+            assert crud.get_todo(db_session, todo_id).priority == 5
+
+    def test_by_ids_chunks_large_id_lists(self, db_session, multiple_todos, sql_recorder):
+        """Test that id lists are split to stay under the parameter limit"""
+        ids = [t.id for t in multiple_todos] + list(range(100000, 100000 + crud.MAX_IDS_PER_STATEMENT))
+        
+        with sql_recorder() as statements:
+            result = crud.batch_set_priority_by_ids(db_session, ids, 4)
+        
+        assert len(result) == len(multiple_todos)
+        assert len([s for s in statements if s.startswith("UPDATE")]) == 2
+
+
+class TestBulkCreateTodos:
+    """Test suite for bulk_create_todos function"""
+
+    def test_bulk_create_returns_ids_in_order(self, db_session):
+        """Test that returned ids map to the input order"""
+        todos = [schemas.TodoCreate(title=f"Bulk {i}", priority=i % 5 + 1) for i in range(10)]
+        
+        ids = crud.bulk_create_todos(db_session, todos)
+        
+        assert len(ids) == 10
+        for todo_id, todo in zip(ids, todos):
+            created = crud.get_todo(db_session, todo_id)
+            assert created.title == todo.title
+            assert created.priority == todo.priority
+            assert created.is_completed is False
+            assert created.created_at is not None
+
+    def test_bulk_create_after_existing_rows(self, db_session, multiple_todos):
+        """Test ids are correct when the table already has rows"""
+        ids = crud.bulk_create_todos(db_session, [schemas.TodoCreate(title="After")])
+        
+        assert ids == [max(t.id for t in multiple_todos) + 1]
+
+    def test_bulk_create_single_insert_and_commit(self, db_session, sql_recorder):
+        """Test that all rows go through one executemany INSERT"""
+        todos = [schemas.TodoCreate(title=f"Bulk {i}") for i in range(50)]
+        
+        with patch.object(db_session, 'commit', wraps=db_session.commit) as mock_commit:
+            with sql_recorder() as statements:
+                crud.bulk_create_todos(db_session, todos)
+        
+        assert len([s for s in statements if s.startswith("INSERT")]) == 1
+        mock_commit.assert_called_once()
+        assert crud.get_todos_stats(db_session)["total"] == 50
+
+    def test_bulk_create_empty_list(self, db_session):
+        """Test bulk create with no todos"""
+        assert crud.bulk_create_todos(db_session, []) == []
+
+
+class TestBulkUpdateTodos:
+    """Test suite for bulk_update_todos function"""
+
+    def test_bulk_update_mixed_fields(self, db_session, multiple_todos):
+        """Test heterogeneous updates applied in one call"""
+        items = [
+            schemas.TodoBulkUpdateItem(id=multiple_todos[0].id, changes=schemas.TodoUpdate(title="A")),
+            schemas.TodoBulkUpdateItem(id=multiple_todos[1].id, changes=schemas.TodoUpdate(title="B")),
+            schemas.TodoBulkUpdateItem(id=multiple_todos[2].id, changes=schemas.TodoUpdate(is_completed=True)),
+            schemas.TodoBulkUpdateItem(id=multiple_todos[3].id, changes=schemas.TodoUpdate(priority=5)),
+        ]
+        
+        result = crud.bulk_update_todos(db_session, items)
+        
+        assert result == [True, True, True, True]
+        db_session.expire_all()
+        assert crud.get_todo(db_session, multiple_todos[0].id).title == "A"
+        assert crud.get_todo(db_session, multiple_todos[1].id).title == "B"
+        completed = crud.get_todo(db_session, multiple_todos[2].id)
+        assert completed.is_completed is True
+        assert completed.completed_at is not None
+        assert crud.get_todo(db_session, multiple_todos[3].id).priority == 5
+
+    def test_bulk_update_reports_not_found(self, db_session, sample_todo):
+        """Test that unknown ids are reported per item"""
+        items = [
+            schemas.TodoBulkUpdateItem(id=99999, changes=schemas.TodoUpdate(title="Missing")),
+            schemas.TodoBulkUpdateItem(id=sample_todo.id, changes=schemas.TodoUpdate(title="Found")),
+        ]
+        
+        assert crud.bulk_update_todos(db_session, items) == [False, True]
+
+    def test_bulk_update_checks_versions(self, db_session, multiple_todos, sql_recorder):
+        """Test that items with a stale version are reported as conflicts and left unchanged"""
+        fresh, stale, unchecked = multiple_todos[:3]
+        items = [
+            schemas.TodoBulkUpdateItem(id=fresh.id, version=fresh.version, changes=schemas.TodoUpdate(title="A")),
+            schemas.TodoBulkUpdateItem(id=stale.id, version=stale.version - 1, changes=schemas.TodoUpdate(title="B")),
+            schemas.TodoBulkUpdateItem(id=unchecked.id, changes=schemas.TodoUpdate(title="C")),
+        ]
+        
+        with sql_recorder() as statements:
+            result = crud.bulk_update_todos(db_session, items)
+        
+        assert result[0] is True and result[2] is True
+        assert isinstance(result[1], crud.VersionConflict)
+        db_session.expire_all()
+        assert crud.get_todo(db_session, fresh.id).title == "A"
+        assert crud.get_todo(db_session, stale.id).title != "B"
+        assert crud.get_todo(db_session, unchecked.id).title == "C"
+        assert any("version IN" in s for s in statements if s.startswith("UPDATE"))
+
+    def test_bulk_update_merges_edits_of_same_todo(self, db_session, sample_todo):
+        """Test that later edits of the same todo win"""
+        items = [
+            schemas.TodoBulkUpdateItem(id=sample_todo.id, changes=schemas.TodoUpdate(title="First", priority=2)),
+            schemas.TodoBulkUpdateItem(id=sample_todo.id, changes=schemas.TodoUpdate(title="Second")),
+        ]
+        
+        crud.bulk_update_todos(db_session, items)
+        
+        db_session.expire_all()
+        todo = crud.get_todo(db_session, sample_todo.id)
+        assert todo.title == "Second"
+        assert todo.priority == 2
+
+    def test_bulk_update_groups_by_changed_fields(self, db_session, multiple_todos, sql_recorder):
+        """Test one UPDATE statement per distinct set of changed fields"""
+        items = [
+            schemas.TodoBulkUpdateItem(id=todo.id, changes=schemas.TodoUpdate(title=f"T{todo.id}"))
+            for todo in multiple_todos[:3]
+        ] + [
+            schemas.TodoBulkUpdateItem(id=todo.id, changes=schemas.TodoUpdate(priority=3))
+            for todo in multiple_todos[3:]
+        ]
+        
+        with sql_recorder() as statements:
+            crud.bulk_update_todos(db_session, items)
+        
+        assert len([s for s in statements if s.startswith("UPDATE")]) == 2
+
+    def test_bulk_update_skips_todo_deleted_concurrently(self, db_session, multiple_todos):
+        """Test that a todo soft-deleted by another writer right before the UPDATE is neither edited nor reported"""
+        from sqlalchemy import event
+        
+        engine = db_session.get_bind()
+        victim = multiple_todos[0]
+        original_title = victim.title
+        fired = []
+        
+        def delete_first(conn, cursor, statement, *args):
+            if statement.startswith("UPDATE todos") and not fired:
+                fired.append(True)
+                with engine.begin() as other:
+                    other.execute(
+                        models.Todo.__table__.update()
+                        .where(models.Todo.id == victim.id)
+                        .values(deleted_at=datetime.now())
+                    )
+        
+        items = [
+            schemas.TodoBulkUpdateItem(id=todo.id, changes=schemas.TodoUpdate(title="Edited"))
+            for todo in multiple_todos[:2]
+        ]
+        event.listen(engine, "before_cursor_execute", delete_first)
+        try:
+            result = crud.bulk_update_todos(db_session, items)
+        finally:
+            event.remove(engine, "before_cursor_execute", delete_first)
+        
+        assert result == [False, True]
+        db_session.expire_all()
+        assert db_session.get(models.Todo, victim.id).title == original_title
+
+
+class TestSoftDelete:
+    """Test suite for tombstone deletes and purging"""
+
+    def test_delete_keeps_tombstone(self, db_session, sample_todo):
+        """Test that delete only marks the row as deleted"""
+        crud.delete_todo(db_session, sample_todo.id)
+        
+        row = db_session.query(models.Todo).filter(models.Todo.id == sample_todo.id).first()
+        assert row is not None
+        assert row.deleted_at is not None
+        assert crud.get_todo(db_session, sample_todo.id) is None
+
+    def test_deleted_todo_hidden_from_reads_and_writes(self, db_session, multiple_todos):
+        """Test that tombstoned todos are invisible to every crud path"""
+        todo_id = multiple_todos[0].id
+        crud.delete_todo(db_session, todo_id)
+        
+        todos, total = crud.get_todos(db_session)
+        assert todo_id not in [t.id for t in todos]
+        assert total == len(multiple_todos) - 1
+        assert crud.toggle_todo(db_session, todo_id) is None
+        assert crud.update_todo(db_session, todo_id, schemas.TodoUpdate(title="X")) is None
+        assert crud.delete_todo(db_session, todo_id) is False
+        assert crud.get_todos_stats(db_session)["total"] == len(multiple_todos) - 1
+
+    def test_get_deleted_todos_since(self, db_session, multiple_todos):
+        """Test the tombstone feed for sync clients"""
+        crud.delete_todo(db_session, multiple_todos[0].id)
+        checkpoint = datetime.now()
+        crud.batch_delete_by_ids(db_session, [multiple_todos[1].id, multiple_todos[2].id])
+        
+        all_deleted = crud.get_deleted_todos(db_session)
+        recent = crud.get_deleted_todos(db_session, since=checkpoint)
+        
+        assert [row.id for row in all_deleted][0] == multiple_todos[0].id
+        assert len(all_deleted) == 3
+        assert sorted(row.id for row in recent) == [multiple_todos[1].id, multiple_todos[2].id]
+
+    def test_get_deleted_todos_pages_through_shared_timestamp(self, db_session):
+        """Test that paging by (deleted_at, id) returns every tombstone of one batch delete"""
+        crud.bulk_create_todos(db_session, [schemas.TodoCreate(title=f"Todo {i}") for i in range(250)])
+        crud.batch_delete_all(db_session)
+        
+        seen, since, since_id = [], None, None
+        while True:
+            page = crud.get_deleted_todos(db_session, since=since, since_id=since_id, limit=100)
+            if not page:
+                break
+            seen.extend(row.id for row in page)
+            since, since_id = page[-1].deleted_at, page[-1].id
+        
+        assert len({row.deleted_at for row in crud.get_deleted_todos(db_session, limit=1000)}) == 1
+        assert len(seen) == len(set(seen)) == 250
+
+    def test_get_deleted_todos_since_id_requires_since(self, db_session):
+        """Test that since_id without since raises instead of restarting the feed"""
+        with pytest.raises(ValueError):
+            crud.get_deleted_todos(db_session, since_id=1)
+
+    def test_purge_deleted_todos_in_chunks(self, db_session, many_todos):
+        """Test that old tombstones are hard-deleted chunk by chunk"""
+        crud.batch_delete_all(db_session)
+        
+        with patch.object(db_session, 'commit', wraps=db_session.commit) as mock_commit:
+            purged = crud.purge_deleted_todos(
+                db_session, deleted_before=datetime.now() + timedelta(seconds=1), chunk_size=8
+            )
+        
+        # The highest id is kept so SQLite never hands out a removed id again
+        assert purged == len(many_todos) - 1
+        assert mock_commit.call_count == 3
+        assert db_session.query(models.Todo.id).all() == [(many_todos[-1].id,)]
+        assert crud.get_todos_stats(db_session)["total"] == 0
+
+    def test_purge_keeps_recent_tombstones(self, db_session, sample_todo):
+        """Test that tombstones inside the retention window survive"""
+        crud.delete_todo(db_session, sample_todo.id)
+        
+        purged = crud.purge_deleted_todos(db_session, deleted_before=datetime.now() - timedelta(days=1))
+        
+        assert purged == 0
+        assert crud.get_deleted_todos(db_session)[0].id == sample_todo.id
+
+
+class TestArchiveCompletedTodos:
+    """Test suite for moving old completed todos into todos_archive"""
+
+    def _complete_long_ago(self, db_session, todos):
+        for todo in todos:
+            todo.is_completed = True
+            todo.completed_at = datetime.now() - timedelta(days=60)
+        db_session.commit()
+
+    def test_archive_moves_old_completed_todos(self, db_session, multiple_todos):
+        """Test that old completed todos leave the hot table but keep their ids"""
+        old, recent, keeper = multiple_todos[0], multiple_todos[1], multiple_todos[-1]
+        self._complete_long_ago(db_session, [old, keeper])
+        crud.toggle_todo(db_session, recent.id)
+        old_id, old_title = old.id, old.title
+        stats_before = crud.get_todos_stats(db_session)
+        
+        archived = crud.archive_completed_todos(db_session, completed_before=datetime.now() - timedelta(days=30))
+        
+        assert archived == 1
+        assert crud.get_todo(db_session, old_id) is None
+        archived_todo = crud.get_archived_todo(db_session, old_id)
+        assert archived_todo.title == old_title
+        assert archived_todo.is_completed is True
+        # The newest row stays behind so its id is never reused
+        assert crud.get_todo(db_session, keeper.id) is not None
+        assert crud.get_todo(db_session, recent.id) is not None
+        assert crud.get_todos_stats(db_session)["total"] == stats_before["total"]
+        assert crud.get_todos_stats(db_session)["completed"] == stats_before["completed"]
+
+    def test_archive_in_chunks(self, db_session, many_todos):
+        """Test that archiving commits once per chunk"""
+        self._complete_long_ago(db_session, many_todos)
+        
+        with patch.object(db_session, 'commit', wraps=db_session.commit) as mock_commit:
+            archived = crud.archive_completed_todos(db_session, completed_before=datetime.now(), chunk_size=8)
+        
+        assert archived == len(many_todos) - 1
+        assert mock_commit.call_count == 3
+        assert db_session.query(models.TodoArchive).count() == len(many_todos) - 1
+
+    def test_get_todos_archived(self, db_session, many_todos):
+        """Test that archived todos are listed newest first with cursor pagination"""
+        self._complete_long_ago(db_session, many_todos)
+        expected = [todo.id for todo in reversed(many_todos[:-1])]
+        crud.archive_completed_todos(db_session, completed_before=datetime.now())
+        
+        first, total = crud.get_todos(db_session, status="completed", limit=5, archived=True)
+        rest, _ = crud.get_todos(
+            db_session, status="completed", limit=100, archived=True, cursor=crud.encode_cursor(first[-1])
+        )
+        
+        assert total == len(many_todos) - 1
+        assert [todo.id for todo in first + rest] == expected
+        assert crud.get_todos(db_session, archived=False)[1] == 1
+
+    def test_completed_list_continues_into_archive(self, db_session, many_todos):
+        """Test that status=completed lists hot completed todos, then archived ones"""
+        self._complete_long_ago(db_session, many_todos[:10])
+        hot = [todo.id for todo in reversed(many_todos[10:]) if todo.is_completed]
+        cold = [todo.id for todo in reversed(many_todos[:10])]
+        crud.archive_completed_todos(db_session, completed_before=datetime.now())
+        
+        todos, total = crud.get_todos(db_session, status="completed", limit=100)
+        assert [todo.id for todo in todos] == hot + cold
+        assert total == len(hot) + len(cold)
+        assert crud.get_todos_stats(db_session)["completed"] == total
+        
+        by_offset = []
+        for skip in range(0, total, 4):
+            by_offset += crud.get_todos(db_session, status="completed", skip=skip, limit=4)[0]
+        assert [todo.id for todo in by_offset] == hot + cold
+        
+        by_cursor, cursor = [], None
+        while True:
+            page, _ = crud.get_todos(db_session, status="completed", limit=2, cursor=cursor)
+            if not page:
+                break
+            by_cursor += page
+            cursor = crud.encode_cursor(page[-1])
+        assert [todo.id for todo in by_cursor] == hot + cold
+
+    def test_chunked_delete_all_tombstones_archive(self, db_session, many_todos):
+        """Test that deleting everything also moves archived todos back as tombstones"""
+        self._complete_long_ago(db_session, many_todos)
+        crud.archive_completed_todos(db_session, completed_before=datetime.now())
+        
+        deleted = crud.batch_delete_all(db_session, chunk_size=6)
+        
+        assert deleted == len(many_todos)
+        assert db_session.query(models.TodoArchive).count() == 0
+        assert len(crud.get_deleted_todos(db_session, limit=1000)) == len(many_todos)
+        assert crud.get_todos_stats(db_session)["total"] == 0
+
+
+class TestSearchTodos:
+    """Test suite for FTS5 full-text search"""
+
+    def test_search_ranks_title_matches_first(self, db_session):
+        """Test that title hits outrank description hits"""
+        db_session.add_all([
+            models.Todo(title="Call mom", description="ask about the milk recipe"),
+            models.Todo(title="Buy milk", description="from the store"),
+            models.Todo(title="Walk the dog"),
+        ])
+        db_session.commit()
+        
+        todos, total = crud.search_todos(db_session, "milk")
+        
+        assert total == 2
+        assert [t.title for t in todos] == ["Buy milk", "Call mom"]
+
+    def test_search_index_follows_writes(self, db_session, sample_todo):
+        """Test that triggers keep the index in sync with updates and deletes"""
+        crud.update_todo(db_session, sample_todo.id, schemas.TodoUpdate(title="Renamed quarterly report"))
+        
+        assert crud.search_todos(db_session, "quarterly")[1] == 1
+        assert crud.search_todos(db_session, sample_todo.title.split()[0] + "zzz")[1] == 0
+        
+        crud.delete_todo(db_session, sample_todo.id)
+        assert crud.search_todos(db_session, "quarterly")[1] == 0
+        
+        crud.purge_deleted_todos(db_session, deleted_before=datetime.now() + timedelta(seconds=1))
+        assert crud.search_todos(db_session, "quarterly")[1] == 0
+
+    def test_search_escapes_query_syntax(self, db_session):
+        """Test that FTS operators and quotes in user input are matched literally"""
+        db_session.add(models.Todo(title='Fix "OR" bug - urgent'))
+        db_session.commit()
+        
+        todos, total = crud.search_todos(db_session, '"OR" -')
+        
+        assert total == 1
+        assert crud.search_todos(db_session, "   ") == ([], 0)
+
+    def test_search_uses_fts_index(self, db_session, sample_todo, query_plans):
+        """Test that search is driven by the FTS index and primary key lookups"""
+        with query_plans() as plans:
+            crud.search_todos(db_session, "milk")
+        
+        for detail in plans:
+            assert "todos_fts VIRTUAL TABLE INDEX" in detail
+            assert "SEARCH todos USING INTEGER PRIMARY KEY" in detail
+
+    def test_search_index_rebuilt_for_existing_database(self):
+        """Test that upgrading a database backfills the FTS index from existing rows"""
+        from sqlalchemy import create_engine
+        from app.database import Base
+        
+        engine = create_engine("sqlite://")
+        Base.metadata.create_all(bind=engine)
+        with engine.begin() as conn:
+            # A database from before search existed: no FTS table and no sync triggers
+            for trigger in ("todos_fts_insert", "todos_fts_delete", "todos_fts_update"):
+                conn.exec_driver_sql(f"DROP TRIGGER {trigger}")
+            conn.exec_driver_sql("DROP TABLE todos_fts")
+            conn.exec_driver_sql("INSERT INTO todos (title, is_completed) VALUES ('legacy invoice', 0)")
+        
+        Base.metadata.create_all(bind=engine)
+        
+        with engine.connect() as conn:
+            matches = conn.exec_driver_sql(
+                "SELECT rowid FROM todos_fts WHERE todos_fts MATCH 'invoice'"
+            ).fetchall()
+        assert len(matches) == 1
+
+
+class TestFuzzySearchTodos:
+    """Test suite for typo-tolerant title search over the trigram index"""
+
+    def test_fuzzy_search_tolerates_typos(self, db_session):
+        """Test that misspelled queries still find the title, best match first"""
+        db_session.add_all([
+            models.Todo(title="Receive package"),
+            models.Todo(title="Receipt archive"),
+            models.Todo(title="Walk the dog"),
+        ])
+        db_session.commit()
+        
+        todos, total = crud.fuzzy_search_todos(db_session, "recieve packge")
+        
+        assert todos[0].title == "Receive package"
+        assert "Walk the dog" not in [t.title for t in todos]
+        assert total == len(todos)
+
+    def test_fuzzy_search_handles_cjk(self, db_session):
+        """Test that CJK titles are matched character-wise despite a wrong character"""
+        db_session.add_all([
+            models.Todo(title="购买牛奶和面包"),
+            models.Todo(title="整理房间"),
+        ])
+        db_session.commit()
+        
+        todos, total = crud.fuzzy_search_todos(db_session, "购买牛乃和面包")
+        
+        assert total == 1
+        assert todos[0].title == "购买牛奶和面包"
+
+    def test_fuzzy_search_follows_writes(self, db_session, sample_todo):
+        """Test that renamed and deleted todos leave the trigram index"""
+        crud.update_todo(db_session, sample_todo.id, schemas.TodoUpdate(title="Quarterly report"))
+        assert crud.fuzzy_search_todos(db_session, "quartrly report")[1] == 1
+        
+        crud.delete_todo(db_session, sample_todo.id)
+        assert crud.fuzzy_search_todos(db_session, "quartrly report")[1] == 0
+
+    def test_fuzzy_search_single_character_returns_nothing(self, db_session, sample_todo):
+        """Test that one-character queries do not hit the database"""
+        assert crud.fuzzy_search_todos(db_session, "a") == ([], 0)
+
+    def test_fuzzy_search_two_character_cjk(self, db_session):
+        """Test that two-character queries find titles containing them anywhere"""
+        db_session.add_all([
+            models.Todo(title="写报告"),
+            models.Todo(title="报告"),
+            models.Todo(title="提交季度报告给经理"),
+            models.Todo(title="买菜"),
+            models.Todo(title="报名"),
+        ])
+        db_session.commit()
+        
+        todos, total = crud.fuzzy_search_todos(db_session, "报告")
+        
+        assert total == 3
+        assert todos[0].title == "报告"
+        assert {t.title for t in todos} == {"写报告", "报告", "提交季度报告给经理"}
+        assert [t.title for t in crud.fuzzy_search_todos(db_session, "买菜")[0]] == ["买菜"]
+
+    def test_fuzzy_search_two_character_follows_writes(self, db_session, sample_todo):
+        """Test that the bigram lookup sees renames and skips soft-deleted todos"""
+        crud.update_todo(db_session, sample_todo.id, schemas.TodoUpdate(title="去超市买菜"))
+        assert crud.fuzzy_search_todos(db_session, "买菜")[1] == 1
+        assert crud.fuzzy_search_todos(db_session, "te")[1] == 0
+        
+        crud.delete_todo(db_session, sample_todo.id)
+        assert crud.fuzzy_search_todos(db_session, "买菜")[1] == 0
+
+    def test_fuzzy_search_total_is_unknown_when_candidates_capped(self, db_session, monkeypatch):
+        """Test that total is None once the candidate limit is reached and the newest candidates win"""
+        monkeypatch.setattr(crud, "FUZZY_CANDIDATES", 2)
+        db_session.add_all([models.Todo(title=f"报告 {i}") for i in range(3)])
+        db_session.commit()
+        
+        todos, total = crud.fuzzy_search_todos(db_session, "报告")
+        
+        assert total is None
+        assert {t.title for t in todos} == {"报告 1", "报告 2"}
+
+    def test_fuzzy_search_uses_trigram_index(self, db_session, sample_todo, query_plans):
+        """Test that candidates come from the trigram index, never a scan of todos"""
+        with query_plans() as plans:
+            crud.fuzzy_search_todos(db_session, "tets todo")
+        
+        assert plans
+        for detail in plans:
+            assert "todos_title_trigram VIRTUAL TABLE INDEX" in detail
+            assert "SEARCH todos USING INTEGER PRIMARY KEY" in detail
+
+    def test_fuzzy_search_two_character_uses_term_range(self, db_session, sample_todo, query_plans):
+        """Test that two-character queries seek the trigram vocabulary by prefix"""
+        with query_plans() as plans:
+            crud.fuzzy_search_todos(db_session, "报告")
+        
+        assert plans
+        for detail in plans:
+            assert "todos_title_trigram_terms VIRTUAL TABLE INDEX" in detail
+            assert "SEARCH todos USING INTEGER PRIMARY KEY" in detail
+            assert "SCAN todos " not in detail
+
+
+class TestOptimisticConcurrency:
+    """Test suite for the version column and conditional updates"""
+
+    def test_every_update_bumps_version(self, db_session):
+        """Test that single, toggle and bulk updates all increment the version"""
+        todo = crud.create_todo(db_session, schemas.TodoCreate(title="Versioned"))
+        assert todo.version == 1
+        
+        assert crud.update_todo(db_session, todo.id, schemas.TodoUpdate(title="Renamed")).version == 2
+        assert crud.toggle_todo(db_session, todo.id).version == 3
+        crud.bulk_update_todos(db_session, [schemas.TodoBulkUpdateItem(id=todo.id, changes=schemas.TodoUpdate(priority=4))])
+        crud.batch_set_priority_by_ids(db_session, [todo.id], 2)
+        assert crud.get_todo(db_session, todo.id).version == 5
+
+    def test_matching_version_updates_in_one_statement(self, db_session, sample_todo, sql_recorder):
+        """Test that the version check and increment are a single conditional UPDATE"""
+        with sql_recorder() as statements:
+            result = crud.update_todo(
+                db_session, sample_todo.id, schemas.TodoUpdate(title="Checked"), expected_versions=[1]
+            )
+        
+        assert result.version == 2
+        assert len(statements) == 1
+        assert "todos.version IN" in statements[0]
+
+    def test_stale_version_raises_conflict(self, db_session, sample_todo):
+        """Test that a stale version is rejected and leaves the row untouched"""
+        crud.toggle_todo(db_session, sample_todo.id)
+        
+        with pytest.raises(crud.VersionConflict):
+            crud.update_todo(db_session, sample_todo.id, schemas.TodoUpdate(title="Lost"), expected_versions=[1])
+        with pytest.raises(crud.VersionConflict):
+            crud.toggle_todo(db_session, sample_todo.id, expected_versions=[1])
+        with pytest.raises(crud.VersionConflict):
+            crud.delete_todo(db_session, sample_todo.id, expected_versions=[1])
+        with pytest.raises(crud.VersionConflict):
+            crud.update_todo(db_session, sample_todo.id, schemas.TodoUpdate(), expected_versions=[1])
+        
+        current = crud.get_todo(db_session, sample_todo.id)
+        assert current.title == "Sample Todo"
+        assert current.version == 2
+
+    def test_missing_todo_is_not_a_conflict(self, db_session):
+        """Test that a missing todo still reports not found instead of a conflict"""
+        assert crud.update_todo(db_session, 999, schemas.TodoUpdate(title="x"), expected_versions=[1]) is None
+        assert crud.toggle_todo(db_session, 999, expected_versions=[1]) is None
+        assert crud.delete_todo(db_session, 999, expected_versions=[1]) is False
@@ -8,7 +8,7 @@ from sqlalchemy import create_engine
 from sqlalchemy.orm import sessionmaker
 from sqlalchemy.exc import IntegrityError
 
-from app.models import Todo
+from app.models import Todo, TodoArchive, TodoCounter
 from app.database import Base
 
 
@@ -347,3 +347,149 @@ class TestTodoModel:
         db_session.commit()
         
         assert todo.priority == -1
+
+
+class TestTodoIndexes:
+    """Test suite for the managed todo indexes"""
+
+    @staticmethod
+    def _index_names(engine):
+        with engine.connect() as conn:
+            rows = conn.exec_driver_sql(
+                "SELECT name FROM sqlite_master WHERE type='index' AND tbl_name='todos'"
+            )
+            return {row[0] for row in rows}
+
+    def test_indexes_created_with_table(self):
+        """Test that create_all creates the query indexes"""
+        engine = create_engine("sqlite://")
+        Base.metadata.create_all(bind=engine)
+        
+        names = self._index_names(engine)
+        assert "ix_todos_created_at_id" in names
+        assert "ix_todos_completed_created_at_id" in names
+        assert "ix_todos_completed_due_date_id" in names
+
+    def test_indexes_added_to_existing_database(self):
+        """Test that create_all adds missing indexes to an existing table"""
+        engine = create_engine("sqlite://")
+        Base.metadata.create_all(bind=engine)
+        with engine.begin() as conn:
+            conn.exec_driver_sql("DROP INDEX ix_todos_completed_created_at_id")
+            conn.exec_driver_sql("DROP INDEX ix_todos_completed_due_date_id")
+            conn.exec_driver_sql(
+                "CREATE INDEX ix_todos_pending_due_date ON todos (due_date) WHERE is_completed = 0"
+            )
+        
+        Base.metadata.create_all(bind=engine)
+        
+        names = self._index_names(engine)
+        assert "ix_todos_completed_created_at_id" in names
+        assert "ix_todos_completed_due_date_id" in names
+        assert "ix_todos_pending_due_date" not in names
+
+    def test_status_list_query_uses_index(self):
+        """Test that filtered list queries are index searches"""
+        engine = create_engine("sqlite://")
+        Base.metadata.create_all(bind=engine)
+        with engine.connect() as conn:
+            plan = conn.exec_driver_sql(
+                "EXPLAIN QUERY PLAN SELECT * FROM todos WHERE is_completed = 0 AND deleted_at IS NULL "
+                "ORDER BY created_at DESC, id DESC LIMIT 10"
+            ).fetchall()
+        
+        detail = " ".join(row[-1] for row in plan)
+        assert "USING INDEX ix_todos_completed_created_at_id" in detail
+        assert "TEMP B-TREE" not in detail
+
+
+class TestTodoCounters:
+    """Test suite for the trigger-maintained todo_counters row"""
+
+    def _counters(self, session):
+        counter = session.query(TodoCounter).filter(TodoCounter.id == 1).one()
+        session.refresh(counter)
+        return counter.total, counter.completed
+
+    def test_counters_seeded_from_existing_rows(self):
+        """Test that the counter row is seeded from todos already present"""
+        engine = create_engine("sqlite://")
+        Todo.__table__.create(bind=engine)
+        with engine.begin() as conn:
+            conn.exec_driver_sql(
+                "INSERT INTO todos (title, is_completed) VALUES ('a', 1), ('b', 0), ('c', 0)"
+            )
+        
+        Base.metadata.create_all(bind=engine)
+        
+        session = sessionmaker(bind=engine)()
+        assert self._counters(session) == (3, 1)
+
+    def test_counters_track_insert_update_delete(self, db_session):
+        """Test that triggers keep counters in sync with todos"""
+        todo = Todo(title="Counted")
+        db_session.add(todo)
+        db_session.add(Todo(title="Counted Done", is_completed=True))
+        db_session.commit()
+        assert self._counters(db_session) == (2, 1)
+        
+        todo.is_completed = True
+        db_session.commit()
+        assert self._counters(db_session) == (2, 2)
+        
+        todo.title = "Renamed"
+        db_session.commit()
+        assert self._counters(db_session) == (2, 2)
+        
+        db_session.delete(todo)
+        db_session.commit()
+        assert self._counters(db_session) == (1, 1)
+
+
+class TestSchemaUpgrade:
+    """Test suite for upgrading databases created by older versions"""
+
+    def test_missing_column_added(self):
+        """Test that create_all adds deleted_at to an old todos table"""
+        engine = create_engine("sqlite://")
+        with engine.begin() as conn:
+            conn.exec_driver_sql(
+                "CREATE TABLE todos (id INTEGER PRIMARY KEY, title VARCHAR(255) NOT NULL, "
+                "description TEXT, is_completed BOOLEAN NOT NULL, priority INTEGER, "
+                "created_at DATETIME, updated_at DATETIME, completed_at DATETIME, due_date DATETIME)"
+            )
+            conn.exec_driver_sql("INSERT INTO todos (title, is_completed) VALUES ('old', 0)")
+        
+        Base.metadata.create_all(bind=engine)
+        
+        with engine.connect() as conn:
+            columns = {row[1] for row in conn.exec_driver_sql("PRAGMA table_info(todos)")}
+            assert "deleted_at" in columns
+            assert conn.exec_driver_sql("SELECT total FROM todo_counters").scalar() == 1
+
+    def test_changed_index_definition_rebuilt(self):
+        """Test that an index with an outdated definition is recreated"""
+        engine = create_engine("sqlite://")
+        Base.metadata.create_all(bind=engine)
+        with engine.begin() as conn:
+            conn.exec_driver_sql("DROP INDEX ix_todos_created_at_id")
+            conn.exec_driver_sql("CREATE INDEX ix_todos_created_at_id ON todos (created_at, id)")
+        
+        Base.metadata.create_all(bind=engine)
+        
+        with engine.connect() as conn:
+            sql = conn.exec_driver_sql(
+                "SELECT sql FROM sqlite_master WHERE name = 'ix_todos_created_at_id'"
+            ).scalar()
+        assert "WHERE deleted_at IS NULL" in sql
+
+    def test_archive_table_matches_todos(self):
+        """Test that todos_archive is created with the same columns as todos"""
+        engine = create_engine("sqlite://")
+        Base.metadata.create_all(bind=engine)
+        
+        with engine.connect() as conn:
+            todos = [row[1:3] for row in conn.exec_driver_sql("PRAGMA table_info(todos)")]
+            archive = [row[1:3] for row in conn.exec_driver_sql("PRAGMA table_info(todos_archive)")]
+        assert archive == todos
+        assert [c.name for c in TodoArchive.__table__.columns] == [c.name for c in Todo.__table__.columns]
@@ -178,6 +178,43 @@ class TestGetTodosEndpoint:
         assert todo["priority"] == 3
         assert todo["is_completed"] is False
 
+    def test_get_todos_next_cursor_pagination(self, test_client, clean_db):
+        """Test paging through todos with next_cursor"""
+        for i in range(5):
+            test_client.post("/api/v1/todos/", json={"title": f"Cursor Todo {i}"})
+        
+        first = test_client.get("/api/v1/todos/?limit=3").json()
+        assert len(first["data"]) == 3
+        assert first["next_cursor"] is not None
+        
+        second = test_client.get(
+            "/api/v1/todos/", params={"limit": 3, "cursor": first["next_cursor"]}
+        ).json()
+        assert len(second["data"]) == 2
+        assert second["next_cursor"] is None
+        
+        ids = [todo["id"] for todo in first["data"] + second["data"]]
+        assert len(set(ids)) == 5
+
+    def test_get_todos_without_total(self, test_client, clean_db):
+        """Test include_total=false returns has_more instead of total"""
+        for i in range(3):
+            test_client.post("/api/v1/todos/", json={"title": f"Scroll Todo {i}"})
+        
+        first = test_client.get("/api/v1/todos/?limit=2&include_total=false").json()
+        assert first["total"] is None
+        assert first["has_more"] is True
+        
+        last = test_client.get("/api/v1/todos/?limit=2&page=2&include_total=false").json()
+        assert len(last["data"]) == 1
+        assert last["has_more"] is False
+
+    def test_get_todos_invalid_cursor(self, test_client, clean_db):
+        """Test malformed cursor returns 400"""
+        response = test_client.get("/api/v1/todos/?cursor=garbage")
+        
+        assert response.status_code == 400
+
     @patch('app.routes.todos.crud')
     def test_get_todos_database_error_handling(self, mock_crud, test_client):
         """Test error handling when database operation fails"""
@@ -720,3 +757,569 @@ class TestAPIErrorHandling:
         # Check for CORS headers (if configured)
         assert response.status_code == 200
         # Note: Actual CORS header checks would depend on CORS configuration
+
+
+class TestBatchEndpoint:
+    """Test suite for POST /api/v1/todos/batch endpoint"""
+
+    def test_batch_complete_all_chunked(self, test_client, clean_db):
+        """Test chunked complete_all reports the cumulative count"""
+        for i in range(5):
+            test_client.post("/api/v1/todos/", json={"title": f"Chunk Todo {i}"})
+        
+        response = test_client.post(
+            "/api/v1/todos/batch", json={"action": "complete_all", "chunk_size": 2}
+        )
+        
+        assert response.status_code == 200
+        assert response.json()["message"] == "Completed 5 todos"
+
+    def test_batch_invalid_chunk_size(self, test_client, clean_db):
+        """Test that chunk_size must be positive"""
+        response = test_client.post(
+            "/api/v1/todos/batch", json={"action": "delete_all", "chunk_size": 0}
+        )
+        
+        assert response.status_code == 422
+
+    def test_batch_targeted_complete(self, test_client, clean_db):
+        """Test completing selected todos by id"""
+        ids = [
+            test_client.post("/api/v1/todos/", json={"title": f"Target {i}"}).json()["data"]["id"]
+            for i in range(3)
+        ]
+        
+        response = test_client.post(
+            "/api/v1/todos/batch", json={"action": "complete", "todo_ids": ids[:2]}
+        )
+        
+        assert response.status_code == 200
+        data = response.json()["data"]
+        assert data["count"] == 2
+        assert sorted(data["todo_ids"]) == sorted(ids[:2])
+        assert test_client.get(f"/api/v1/todos/{ids[2]}").json()["data"]["is_completed"] is False
+
+    def test_batch_targeted_set_priority(self, test_client, clean_db):
+        """Test setting priority of selected todos"""
+        todo_id = test_client.post("/api/v1/todos/", json={"title": "Prioritize"}).json()["data"]["id"]
+        
+        response = test_client.post(
+            "/api/v1/todos/batch",
+            json={"action": "set_priority", "todo_ids": [todo_id], "priority": 4}
+        )
+        
+        assert response.status_code == 200
+        assert test_client.get(f"/api/v1/todos/{todo_id}").json()["data"]["priority"] == 4
+
+    def test_batch_targeted_requires_ids(self, test_client, clean_db):
+        """Test that targeted actions require todo_ids"""
+        response = test_client.post("/api/v1/todos/batch", json={"action": "delete"})
+        
+        assert response.status_code == 400
+
+    def test_batch_set_priority_requires_priority(self, test_client, clean_db):
+        """Test that set_priority requires a priority"""
+        response = test_client.post(
+            "/api/v1/todos/batch", json={"action": "set_priority", "todo_ids": [1]}
+        )
+        
+        assert response.status_code == 400
+
+
+class TestBulkCreateEndpoint:
+    """Test suite for POST /api/v1/todos/bulk endpoint"""
+
+    def test_bulk_create_success(self, test_client, clean_db):
+        """Test creating several todos in one request"""
+        payload = [{"title": f"Imported {i}", "priority": 2} for i in range(3)]
+        
+        response = test_client.post("/api/v1/todos/bulk", json=payload)
+        
+        assert response.status_code == 201
+        data = response.json()["data"]
+        assert data["count"] == 3
+        assert len(data["todo_ids"]) == 3
+        assert test_client.get("/api/v1/todos/").json()["total"] == 3
+
+    def test_bulk_create_validation_rejects_whole_request(self, test_client, clean_db):
+        """Test that one invalid item rejects the request and inserts nothing"""
+        payload = [{"title": "Valid"}, {"title": ""}]
+        
+        response = test_client.post("/api/v1/todos/bulk", json=payload)
+        
+        assert response.status_code == 422
+        assert test_client.get("/api/v1/todos/").json()["total"] == 0
+
+
+class TestBulkUpdateEndpoint:
+    """Test suite for PATCH /api/v1/todos/bulk endpoint"""
+
+    def test_bulk_update_success_and_not_found(self, test_client, clean_db):
+        """Test per-item results of a bulk update"""
+        todo_id = test_client.post("/api/v1/todos/", json={"title": "Offline"}).json()["data"]["id"]
+        
+        response = test_client.patch("/api/v1/todos/bulk", json=[
+            {"id": todo_id, "changes": {"title": "Synced", "is_completed": True}},
+            {"id": 99999, "changes": {"title": "Gone"}},
+        ])
+        
+        assert response.status_code == 200
+        results = response.json()["data"]
+        assert results[0] == {"id": todo_id, "success": True, "error": None}
+        assert results[1]["success"] is False
+        
+        todo = test_client.get(f"/api/v1/todos/{todo_id}").json()["data"]
+        assert todo["title"] == "Synced"
+        assert todo["is_completed"] is True
+
+    def test_bulk_update_version_conflict(self, test_client, clean_db):
+        """Test that an edit based on an outdated version is rejected per item"""
+        todo = test_client.post("/api/v1/todos/", json={"title": "Shared"}).json()["data"]
+        test_client.put(f"/api/v1/todos/{todo['id']}", json={"title": "Edited elsewhere"})
+        
+        response = test_client.patch("/api/v1/todos/bulk", json=[
+            {"id": todo["id"], "version": todo["version"], "changes": {"title": "Offline edit"}},
+        ])
+        
+        assert response.status_code == 200
+        assert response.json()["data"] == [{"id": todo["id"], "success": False, "error": "Version conflict"}]
+        assert test_client.get(f"/api/v1/todos/{todo['id']}").json()["data"]["title"] == "Edited elsewhere"
+        
+        current = test_client.get(f"/api/v1/todos/{todo['id']}").json()["data"]["version"]
+        retried = test_client.patch("/api/v1/todos/bulk", json=[
+            {"id": todo["id"], "version": current, "changes": {"title": "Offline edit"}},
+        ])
+        assert retried.json()["data"][0]["success"] is True
+
+    def test_bulk_update_validation_error(self, test_client, clean_db):
+        """Test that invalid changes reject the request"""
+        response = test_client.patch("/api/v1/todos/bulk", json=[
+            {"id": 1, "changes": {"priority": 9}}
+        ])
+        
+        assert response.status_code == 422
+
+
+class TestDeletedTodosEndpoint:
+    """Test suite for GET /api/v1/todos/deleted endpoint"""
+
+    def test_deleted_feed_lists_tombstones(self, test_client, clean_db):
+        """Test that deleted todos show up in the tombstone feed"""
+        todo_id = test_client.post("/api/v1/todos/", json={"title": "Temp"}).json()["data"]["id"]
+        test_client.delete(f"/api/v1/todos/{todo_id}")
+        
+        response = test_client.get("/api/v1/todos/deleted")
+        
+        assert response.status_code == 200
+        data = response.json()["data"]
+        assert [item["id"] for item in data] == [todo_id]
+        assert data[0]["deleted_at"] is not None
+        assert test_client.get(f"/api/v1/todos/{todo_id}").status_code == 404
+
+    def test_deleted_feed_since_filter(self, test_client, clean_db):
+        """Test that since excludes older tombstones"""
+        todo_id = test_client.post("/api/v1/todos/", json={"title": "Temp"}).json()["data"]["id"]
+        test_client.delete(f"/api/v1/todos/{todo_id}")
+        
+        response = test_client.get("/api/v1/todos/deleted", params={"since": "2999-01-01T00:00:00"})
+        
+        assert response.status_code == 200
+        assert response.json()["data"] == []
+
+    def test_deleted_feed_pages_with_since_id(self, test_client, clean_db):
+        """Test that since/since_id paging returns tombstones sharing one deleted_at"""
+        test_client.post("/api/v1/todos/bulk", json=[{"title": f"Temp {i}"} for i in range(5)])
+        test_client.post("/api/v1/todos/batch", json={"action": "delete_all"})
+        
+        first = test_client.get("/api/v1/todos/deleted", params={"limit": 2}).json()["data"]
+        rest = test_client.get("/api/v1/todos/deleted", params={
+            "since": first[-1]["deleted_at"], "since_id": first[-1]["id"], "limit": 10
+        }).json()["data"]
+        
+        ids = [item["id"] for item in first + rest]
+        assert len(ids) == len(set(ids)) == 5
+
+    def test_deleted_feed_rejects_since_id_without_since(self, test_client, clean_db):
+        """Test that since_id alone is rejected instead of restarting the feed"""
+        response = test_client.get("/api/v1/todos/deleted", params={"since_id": 3})
+        assert response.status_code == 400
+
+
+class TestArchivedTodosEndpoint:
+    """Test suite for reading archived todos"""
+
+    def test_archived_todo_readable(self, test_client, clean_db):
+        """Test that archived todos stay readable by id and by archived listing"""
+        from app import crud
+        from tests.conftest import TestingSessionLocal
+        
+        ids = [
+            test_client.post("/api/v1/todos/", json={"title": f"Todo {i}"}).json()["data"]["id"]
+            for i in range(3)
+        ]
+        test_client.post("/api/v1/todos/batch", json={"action": "complete_all"})
+        db = TestingSessionLocal()
+        try:
+            crud.archive_completed_todos(db, completed_before=datetime.now() + timedelta(seconds=1))
+        finally:
+            db.close()
+        
+        single = test_client.get(f"/api/v1/todos/{ids[0]}")
+        listing = test_client.get("/api/v1/todos/", params={"status": "completed", "archived": True})
+        
+        assert single.status_code == 200
+        assert single.json()["data"]["is_completed"] is True
+        assert [item["id"] for item in listing.json()["data"]] == ids[1::-1]
+        assert listing.json()["total"] == 2
+        assert test_client.get("/api/v1/todos/").json()["total"] == 1
+
+    def _archive_all_completed(self):
+        from app import crud
+        from tests.conftest import TestingSessionLocal
+        
+        db = TestingSessionLocal()
+        try:
+            crud.archive_completed_todos(db, completed_before=datetime.now() + timedelta(seconds=1))
+        finally:
+            db.close()
+
+    def test_archived_todo_writable(self, test_client, clean_db):
+        """Test that update, toggle and delete reach archived todos"""
+        ids = [
+            test_client.post("/api/v1/todos/", json={"title": f"Todo {i}"}).json()["data"]["id"]
+            for i in range(4)
+        ]
+        test_client.post("/api/v1/todos/batch", json={"action": "complete_all"})
+        self._archive_all_completed()
+        
+        updated = test_client.put(f"/api/v1/todos/{ids[0]}", json={"title": "New"})
+        toggled = test_client.patch(f"/api/v1/todos/{ids[1]}/toggle")
+        deleted = test_client.delete(f"/api/v1/todos/{ids[2]}")
+        
+        assert updated.status_code == 200
+        assert updated.json()["data"]["title"] == "New"
+        assert toggled.status_code == 200
+        assert toggled.json()["data"]["is_completed"] is False
+        assert deleted.status_code == 200
+        assert test_client.get(f"/api/v1/todos/{ids[2]}").status_code == 404
+        assert ids[2] in [item["id"] for item in test_client.get("/api/v1/todos/deleted").json()["data"]]
+        pending = test_client.get("/api/v1/todos/", params={"status": "pending"}).json()["data"]
+        assert [item["id"] for item in pending] == [ids[1]]
+
+    def test_archived_todo_bulk_writable(self, test_client, clean_db):
+        """Test that PATCH /bulk and id-based batch actions reach archived todos"""
+        ids = [
+            test_client.post("/api/v1/todos/", json={"title": f"Todo {i}"}).json()["data"]["id"]
+            for i in range(4)
+        ]
+        test_client.post("/api/v1/todos/batch", json={"action": "complete_all"})
+        self._archive_all_completed()
+        
+        bulk = test_client.patch("/api/v1/todos/bulk", json=[
+            {"id": ids[0], "changes": {"title": "Synced"}},
+        ])
+        uncompleted = test_client.post(
+            "/api/v1/todos/batch", json={"action": "uncomplete", "todo_ids": [ids[1]]}
+        )
+        deleted = test_client.post(
+            "/api/v1/todos/batch", json={"action": "delete", "todo_ids": [ids[2]]}
+        )
+        
+        assert bulk.json()["data"] == [{"id": ids[0], "success": True, "error": None}]
+        assert test_client.get(f"/api/v1/todos/{ids[0]}").json()["data"]["title"] == "Synced"
+        assert uncompleted.json()["data"]["todo_ids"] == [ids[1]]
+        assert test_client.get(f"/api/v1/todos/{ids[1]}").json()["data"]["is_completed"] is False
+        assert deleted.json()["data"]["todo_ids"] == [ids[2]]
+        assert test_client.get(f"/api/v1/todos/{ids[2]}").status_code == 404
+        assert test_client.get("/api/v1/todos/stats/").json()["data"]["total"] == 3
+
+    def test_archived_todo_stale_if_match(self, test_client, clean_db):
+        """Test that a stale If-Match on an archived todo is a conflict and leaves it archived"""
+        todo_id = test_client.post("/api/v1/todos/", json={"title": "Old"}).json()["data"]["id"]
+        test_client.post("/api/v1/todos/", json={"title": "Newest"})
+        test_client.patch(f"/api/v1/todos/{todo_id}/toggle")
+        self._archive_all_completed()
+        
+        response = test_client.delete(f"/api/v1/todos/{todo_id}", headers={"If-Match": '"1"'})
+        
+        assert response.status_code == 412
+        archived = test_client.get("/api/v1/todos/", params={"archived": True}).json()["data"]
+        assert [item["id"] for item in archived] == [todo_id]
+
+    def test_delete_completed_includes_archive(self, test_client, clean_db):
+        """Test that delete_completed removes archived todos and stats agree with the lists"""
+        for i in range(3):
+            test_client.post("/api/v1/todos/", json={"title": f"Todo {i}"})
+        test_client.post("/api/v1/todos/batch", json={"action": "complete_all"})
+        self._archive_all_completed()
+        test_client.post("/api/v1/todos/", json={"title": "Open"})
+        
+        stats = test_client.get("/api/v1/todos/stats/").json()["data"]
+        hot = test_client.get("/api/v1/todos/").json()["total"]
+        archived = test_client.get("/api/v1/todos/", params={"archived": True}).json()["total"]
+        assert stats["total"] == hot + archived == 4
+        
+        response = test_client.post("/api/v1/todos/batch", json={"action": "delete_completed"})
+        
+        assert response.json()["data"]["count"] == 3
+        assert test_client.get("/api/v1/todos/", params={"archived": True}).json()["total"] == 0
+        stats = test_client.get("/api/v1/todos/stats/").json()["data"]
+        assert stats["total"] == test_client.get("/api/v1/todos/").json()["total"] == 1
+        assert stats["completed"] == 0
+
+
+class TestOverdueTodosEndpoint:
+    """Test suite for the status=overdue listing"""
+
+    def test_overdue_listing_paginates_by_due_date(self, test_client, clean_db):
+        """Test that overdue todos come earliest due date first across cursor pages"""
+        now = datetime.now()
+        late_ids = [
+            test_client.post(
+                "/api/v1/todos/", json={"title": f"Late {i}", "due_date": (now - timedelta(days=i + 1)).isoformat()}
+            ).json()["data"]["id"]
+            for i in range(3)
+        ]
+        test_client.post("/api/v1/todos/", json={"title": "Future", "due_date": (now + timedelta(days=1)).isoformat()})
+        
+        first = test_client.get("/api/v1/todos/", params={"status": "overdue", "limit": 2}).json()
+        second = test_client.get(
+            "/api/v1/todos/", params={"status": "overdue", "limit": 2, "cursor": first["next_cursor"]}
+        ).json()
+        
+        assert first["total"] == 3
+        assert [item["id"] for item in first["data"] + second["data"]] == late_ids[::-1]
+        assert second["has_more"] is False
+
+
+class TestSparseFieldsets:
+    """Test suite for the fields= parameter of the list endpoint"""
+
+    def test_fields_limits_payload(self, test_client, clean_db):
+        """Test that only the requested fields are returned"""
+        for i in range(3):
+            test_client.post("/api/v1/todos/", json={"title": f"Todo {i}", "description": "x" * 1000})
+        
+        response = test_client.get("/api/v1/todos/", params={"fields": "id,title,is_completed", "limit": 2})
+        
+        assert response.status_code == 200
+        body = response.json()
+        assert body["total"] == 3
+        assert body["has_more"] is True
+        assert [set(item) for item in body["data"]] == [{"id", "title", "is_completed"}] * 2
+        
+        next_page = test_client.get(
+            "/api/v1/todos/", params={"fields": "title", "limit": 2, "cursor": body["next_cursor"]}
+        ).json()
+        assert next_page["data"] == [{"title": "Todo 0"}]
+
+    def test_fields_unknown_rejected(self, test_client, clean_db):
+        """Test that unknown field names are rejected with 400"""
+        response = test_client.get("/api/v1/todos/", params={"fields": "id,password"})
+        
+        assert response.status_code == 400
+
+
+class TestDescriptionModes:
+    """Test suite for the description= list mode"""
+
+    def test_description_preview_and_none(self, test_client, clean_db):
+        """Test that list views can truncate or omit descriptions"""
+        long_text = "x" * 5000
+        todo_id = test_client.post(
+            "/api/v1/todos/", json={"title": "Long", "description": long_text}
+        ).json()["data"]["id"]
+        
+        preview = test_client.get("/api/v1/todos/", params={"description": "preview"}).json()["data"][0]
+        omitted = test_client.get("/api/v1/todos/", params={"description": "none"}).json()["data"][0]
+        full = test_client.get(f"/api/v1/todos/{todo_id}").json()["data"]
+        
+        assert long_text.startswith(preview["description"])
+        assert len(preview["description"]) < len(long_text)
+        assert "description" not in omitted
+        assert omitted["title"] == "Long"
+        assert full["description"] == long_text
+
+
+class TestSortParameter:
+    """Test suite for the sort= and order= list parameters"""
+
+    def test_sort_by_priority_with_cursor(self, test_client, clean_db):
+        """Test that priority order is stable across cursor pages"""
+        for i in range(5):
+            test_client.post("/api/v1/todos/", json={"title": f"Todo {i}", "priority": i % 2 + 1})
+        
+        params = {"sort": "priority", "order": "desc", "limit": 3}
+        first = test_client.get("/api/v1/todos/", params=params).json()
+        second = test_client.get("/api/v1/todos/", params={**params, "cursor": first["next_cursor"]}).json()
+        
+        items = first["data"] + second["data"]
+        assert [item["priority"] for item in items] == [2, 2, 1, 1, 1]
+        assert [item["id"] for item in items[:2]] == sorted(item["id"] for item in items[:2])[::-1]
+
+    def test_cursor_from_other_sort_rejected(self, test_client, clean_db):
+        """Test that reusing a cursor with another sort returns 400"""
+        for i in range(3):
+            test_client.post("/api/v1/todos/", json={"title": f"Todo {i}"})
+        cursor = test_client.get("/api/v1/todos/", params={"limit": 1}).json()["next_cursor"]
+        
+        response = test_client.get("/api/v1/todos/", params={"sort": "due_date", "cursor": cursor})
+        
+        assert response.status_code == 400
+
+
+class TestRangeFilters:
+    """Test suite for the priority and due date range filters"""
+
+    def test_priority_and_due_filters(self, test_client, clean_db):
+        """Test the "high priority due this week" view"""
+        now = datetime.now()
+        for i in range(6):
+            test_client.post("/api/v1/todos/", json={
+                "title": f"Todo {i}",
+                "priority": 5 if i % 2 else 2,
+                "due_date": (now + timedelta(days=i * 2)).isoformat()
+            })
+        
+        response = test_client.get("/api/v1/todos/", params={
+            "priority_min": 4,
+            "due_after": now.isoformat(),
+            "due_before": (now + timedelta(days=7)).isoformat()
+        })
+        
+        assert response.status_code == 200
+        assert [item["title"] for item in response.json()["data"]] == ["Todo 3", "Todo 1"]
+
+    def test_range_filter_with_other_sort(self, test_client, clean_db):
+        """Test that a range filter can be combined with sorting by another column"""
+        for i, priority in enumerate([5, 1, 4]):
+            test_client.post("/api/v1/todos/", json={"title": f"Todo {i}", "priority": priority})
+        
+        response = test_client.get(
+            "/api/v1/todos/", params={"priority_min": 4, "sort": "created_at", "order": "asc"}
+        )
+        
+        assert response.status_code == 200
+        assert [item["title"] for item in response.json()["data"]] == ["Todo 0", "Todo 2"]
+
+    def test_priority_out_of_range_rejected(self, test_client, clean_db):
+        """Test that priority bounds are validated"""
+        response = test_client.get("/api/v1/todos/", params={"priority_min": 9})
+        
+        assert response.status_code == 422
+
+
+class TestSearchEndpoint:
+    """Test suite for GET /api/v1/todos/search"""
+
+    def test_search_paginates_ranked_results(self, test_client, clean_db):
+        """Test that search results are ranked and paginated"""
+        test_client.post("/api/v1/todos/", json={"title": "Plan trip", "description": "book a hotel"})
+        for i in range(3):
+            test_client.post("/api/v1/todos/", json={"title": f"Hotel booking {i}"})
+        test_client.post("/api/v1/todos/", json={"title": "Unrelated"})
+        
+        first = test_client.get("/api/v1/todos/search", params={"q": "hotel", "limit": 3}).json()
+        second = test_client.get("/api/v1/todos/search", params={"q": "hotel", "limit": 3, "page": 2}).json()
+        
+        assert first["total"] == 4
+        assert first["has_more"] is True
+        assert all(item["title"].startswith("Hotel") for item in first["data"])
+        assert [item["title"] for item in second["data"]] == ["Plan trip"]
+        assert second["has_more"] is False
+
+    def test_search_requires_query(self, test_client, clean_db):
+        """Test that an empty query is rejected"""
+        assert test_client.get("/api/v1/todos/search").status_code == 422
+
+    def test_fuzzy_search(self, test_client, clean_db):
+        """Test that fuzzy=true matches misspelled titles"""
+        test_client.post("/api/v1/todos/", json={"title": "Schedule meeting"})
+        test_client.post("/api/v1/todos/", json={"title": "Unrelated"})
+        
+        response = test_client.get("/api/v1/todos/search", params={"q": "shedule meting", "fuzzy": True})
+        
+        assert response.status_code == 200
+        assert [item["title"] for item in response.json()["data"]] == ["Schedule meeting"]
+
+    def test_fuzzy_search_two_character_cjk(self, test_client, clean_db):
+        """Test that two-character CJK queries are accepted"""
+        test_client.post("/api/v1/todos/", json={"title": "写周报告"})
+        test_client.post("/api/v1/todos/", json={"title": "买菜"})
+        
+        response = test_client.get("/api/v1/todos/search", params={"q": "报告", "fuzzy": True})
+        
+        assert response.status_code == 200
+        assert [item["title"] for item in response.json()["data"]] == ["写周报告"]
+        assert response.json()["total"] == 1
+
+    def test_fuzzy_search_rejects_short_query(self, test_client, clean_db):
+        """Test that fuzzy search needs at least two characters"""
+        response = test_client.get("/api/v1/todos/search", params={"q": "a", "fuzzy": True})
+        assert response.status_code == 400
+
+
+class TestAutocompleteEndpoint:
+    """Test suite for GET /api/v1/todos/autocomplete"""
+
+    def test_autocomplete_suggests_titles(self, test_client, clean_db):
+        """Test that created titles are suggested by prefix"""
+        for title in ("Book flights", "Book hotel", "Pack bags"):
+            test_client.post("/api/v1/todos/", json={"title": title})
+        
+        response = test_client.get("/api/v1/todos/autocomplete", params={"prefix": "book", "limit": 5})
+        
+        assert response.status_code == 200
+        assert response.json()["data"] == ["Book flights", "Book hotel"]
+
+    def test_autocomplete_requires_prefix(self, test_client, clean_db):
+        """Test that an empty prefix is rejected"""
+        assert test_client.get("/api/v1/todos/autocomplete").status_code == 422
+
+
+class TestConditionalRequests:
+    """Test suite for ETag and If-Match handling"""
+
+    def test_etag_follows_version(self, test_client, clean_db):
+        """Test that ETag is returned on read and write and changes on update"""
+        created = test_client.post("/api/v1/todos/", json={"title": "Tagged"})
+        todo_id = created.json()["data"]["id"]
+        assert created.headers["ETag"] == '"1"'
+        
+        fetched = test_client.get(f"/api/v1/todos/{todo_id}")
+        assert fetched.headers["ETag"] == '"1"'
+        assert fetched.json()["data"]["version"] == 1
+        
+        updated = test_client.put(
+            f"/api/v1/todos/{todo_id}", json={"title": "Retagged"}, headers={"If-Match": '"1"'}
+        )
+        assert updated.status_code == 200
+        assert updated.headers["ETag"] == '"2"'
+
+    def test_stale_if_match_returns_412(self, test_client, clean_db):
+        """Test that writes with an outdated ETag are rejected"""
+        todo_id = test_client.post("/api/v1/todos/", json={"title": "Contended"}).json()["data"]["id"]
+        test_client.patch(f"/api/v1/todos/{todo_id}/toggle")
+        
+        stale = {"If-Match": '"1"'}
+        assert test_client.put(f"/api/v1/todos/{todo_id}", json={"title": "Lost"}, headers=stale).status_code == 412
+        assert test_client.patch(f"/api/v1/todos/{todo_id}/toggle", headers=stale).status_code == 412
+        assert test_client.delete(f"/api/v1/todos/{todo_id}", headers=stale).status_code == 412
+        assert test_client.get(f"/api/v1/todos/{todo_id}").json()["data"]["title"] == "Contended"
+
+    def test_if_match_list_and_wildcard(self, test_client, clean_db):
+        """Test that any listed ETag matches, * skips the check and weak tags never match"""
+        todo_id = test_client.post("/api/v1/todos/", json={"title": "Flexible"}).json()["data"]["id"]
+        
+        assert test_client.patch(
+            f"/api/v1/todos/{todo_id}/toggle", headers={"If-Match": 'W/"1"'}
+        ).status_code == 412
+        assert test_client.patch(
+            f"/api/v1/todos/{todo_id}/toggle", headers={"If-Match": '"7", "1"'}
+        ).status_code == 200
+        assert test_client.delete(f"/api/v1/todos/{todo_id}", headers={"If-Match": "*"}).status_code == 200
+
+    def test_if_match_on_missing_todo_returns_404(self, test_client, clean_db):
+        """Test that a missing todo is reported as not found"""
+        response = test_client.put("/api/v1/todos/999", json={"title": "x"}, headers={"If-Match": '"1"'})
+        assert response.status_code == 404
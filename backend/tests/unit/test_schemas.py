@@ -394,13 +394,18 @@ class TestEnumClasses:
         assert "all" in filter_values
         assert "completed" in filter_values
         assert "pending" in filter_values
-        assert len(filter_values) == 3
+        assert "overdue" in filter_values
+        assert len(filter_values) == 4
 
         batch_values = [action.value for action in BatchAction]
         assert "delete_completed" in batch_values
         assert "delete_all" in batch_values
         assert "complete_all" in batch_values
-        assert len(batch_values) == 3
+        assert "complete" in batch_values
+        assert "uncomplete" in batch_values
+        assert "delete" in batch_values
+        assert "set_priority" in batch_values
+        assert len(batch_values) == 7
 
 
 class TestBatchRequestSchema:
@@ -476,6 +481,20 @@ class TestResponseSchemas:
         assert list_response.page == 1
         assert list_response.limit == 10
 
+    def test_todo_list_response_optional_total(self):
+        """Test TodoListResponse without total"""
+        list_response = TodoListResponse(
+            success=True,
+            data=[],
+            page=1,
+            limit=10,
+            has_more=True
+        )
+        
+        assert list_response.total is None
+        assert list_response.has_more is True
+        assert list_response.next_cursor is None
+
     def test_single_todo_response(self):
         """Test SingleTodoResponse structure"""
         now = datetime.now()